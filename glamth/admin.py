@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 from .models import *
+from .vehicle_board import board_refresh
 
 # =====================================================
 # ✅ CUSTOM USER ADMIN
@@ -220,6 +221,21 @@ class GatePassAdmin(admin.ModelAdmin):
 
     ordering = ("-created_at",)
 
+    # status / valid_to edits and deletes here must reach the vehicles-out board too
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        board_refresh([obj.id])
+
+    def delete_model(self, request, obj):
+        pass_id = obj.id
+        super().delete_model(request, obj)
+        board_refresh([pass_id])
+
+    def delete_queryset(self, request, queryset):
+        pass_ids = list(queryset.values_list("id", flat=True))
+        super().delete_queryset(request, queryset)
+        board_refresh(pass_ids)
+
 
 # =====================================================
 # ✅ WORK CLAIM ADMIN ✅✅✅
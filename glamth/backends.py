@@ -1,4 +1,12 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
 from .models import User
 
 
@@ -10,3 +18,67 @@ class EmailBackend(ModelBackend):
                 return user
         except User.DoesNotExist:
             return None
+
+
+# =====================================================
+# ✅ BOUNDED PASSWORD HASHING POOL
+# =====================================================
+# PBKDF2 releases the GIL, so a small dedicated pool hashes in parallel
+# and caps how many logins hash at once. Only the hash runs on the pool:
+# the user is read and saved on the request thread, so pool threads never
+# open database connections.
+
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.LOGIN_HASH_WORKERS,
+    thread_name_prefix="login-hash",
+)
+_hash_slots = threading.BoundedSemaphore(
+    settings.LOGIN_HASH_WORKERS + settings.LOGIN_HASH_QUEUE
+)
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins in progress, please retry shortly."
+    default_code = "login_busy"
+
+
+def check_password_hash(password, encoded):
+    """
+    (matches, new encoded password or None). No database access; the new
+    value is set when the hasher or its iterations changed, as
+    User.check_password would.
+    """
+    if encoded is None:
+        make_password(password)   # unknown email costs the same as a wrong password
+        return False, None
+    if not check_password(password, encoded):
+        return False, None
+    preferred = get_hasher()
+    if preferred.algorithm != identify_hasher(encoded).algorithm or preferred.must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def pooled_authenticate(request=None, email=None, password=None):
+    """
+    Email / password login with the hash on the pool. Raises LoginBusy when
+    the pool and its queue stay full for LOGIN_HASH_WAIT seconds.
+    """
+    user = User.objects.filter(email=email).first() if email else None
+
+    if not _hash_slots.acquire(timeout=settings.LOGIN_HASH_WAIT):
+        raise LoginBusy()
+    try:
+        matches, rehashed = _hash_pool.submit(
+            check_password_hash, password, user.password if user else None
+        ).result()
+    finally:
+        _hash_slots.release()
+
+    if not matches:
+        return None
+    if rehashed:
+        user.password = rehashed
+        user.save(update_fields=['password'])
+    return user
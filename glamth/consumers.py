@@ -1,5 +1,15 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .metrics import websocket_connected, websocket_frame_sent
+from .outbound import OutboundQueue, OUTBOUND_STATS
+
+
+# Application close code sent to clients dropped for backpressure
+WS_CLOSE_BACKPRESSURE = 4008
+# Standard close code when the server-side sender fails
+WS_CLOSE_INTERNAL_ERROR = 1011
 
 # class ChatConsumer(AsyncWebsocketConsumer):
 #     async def connect(self):
@@ -25,6 +35,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
         self.user = self.scope["user"]
+        self.room = None
+        self.outbound = None
         if not self.user.is_authenticated:
             await self.close()
             return
@@ -37,14 +49,144 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.room, self.channel_name)
         await self.accept()
 
+        self.start_outbound()
+
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(self.room, self.channel_name)
+        self.stop_outbound()
+        if self.room:
+            await self.channel_layer.group_discard(self.room, self.channel_name)
+
+    async def accept(self, subprotocol=None, headers=None):
+        await super().accept(subprotocol, headers)
+        websocket_connected(self)
+
+    async def send_frame(self, frame):
+        await self.send(text_data=frame)
+        websocket_frame_sent(self)
+
+    def start_outbound(self):
+        self.outbound = OutboundQueue(self.send_frame, on_error=self.outbound_failed)
+        self.outbound.start()
+
+    def stop_outbound(self):
+        # frames arriving after this (group messages in flight) are dropped
+        if self.outbound is not None:
+            self.outbound.stop()
+            self.outbound = None
+
+    async def outbound_failed(self):
+        self.outbound = None
+        await self.close(code=WS_CLOSE_INTERNAL_ERROR)
+
+    async def queue_frame(self, frame, key=None):
+        if self.outbound is None or self.outbound.put(frame, key=key):
+            return
+
+        # ❌ Client cannot keep up
+        if settings.WS_OVERFLOW_POLICY == "close":
+            OUTBOUND_STATS["closed"] += 1
+            self.stop_outbound()
+            await self.close(code=WS_CLOSE_BACKPRESSURE)
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({"type": "chat", "data": event["message"]}))
+        await self.queue_frame(json.dumps({"type": "chat", "data": event["message"]}))
 
     async def dashboard_update(self, event):
-        await self.send(text_data=json.dumps({"type": "dashboard", "data": event["data"]}))
+        # Identical refresh / delta frames inside the window are merged
+        frame = json.dumps({"type": "dashboard", "data": event["data"]}, sort_keys=True)
+        await self.queue_frame(frame, key=frame)
+
+
 
+class StreamConsumer(ChatConsumer):
+    """
+    Multiplexed socket (ws/stream/): the client subscribes to many topics
+    over one connection instead of opening one socket per room.
+
+        {"action": "subscribe", "topics": ["dashboard", "chat:12", "vehicles_out"]}
+        {"action": "unsubscribe", "topic": "chat:12"}
+
+    Frames carry the topic they belong to so the client can demultiplex.
+    """
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        self.groups_joined = {}
+        self.outbound = None
+        if not self.user.is_authenticated:
+            await self.close()
+            return
 
+        await self.accept()
+
+        self.start_outbound()
+
+    async def disconnect(self, code):
+        self.stop_outbound()
+        for group in self.groups_joined.values():
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.groups_joined = {}
+
+    def topic_group(self, topic):
+        if topic == "dashboard":
+            return f"dashboard_{self.user.id}"
+        if topic == "vehicles_out":
+            return "vehicles_out"
+        kind, _, thread_id = str(topic).partition(":")
+        if kind == "chat" and thread_id.isdigit():
+            return f"chat_{thread_id}"
+        return None
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            payload = json.loads(text_data or "")
+        except ValueError:
+            await self.queue_frame(json.dumps({"type": "error", "error": "Invalid JSON"}))
+            return
+        if not isinstance(payload, dict):
+            await self.queue_frame(json.dumps({"type": "error", "error": "Expected a JSON object"}))
+            return
+
+        action = payload.get("action")
+        topics = payload.get("topics") if "topics" in payload else [payload.get("topic")]
+
+        if action not in ("subscribe", "unsubscribe"):
+            await self.queue_frame(json.dumps({"type": "error", "error": "Unknown action"}))
+            return
+        if not isinstance(topics, list) or not topics or not all(isinstance(t, str) for t in topics):
+            await self.queue_frame(json.dumps({"type": "error", "error": "Expected topic names"}))
+            return
+
+        for topic in topics:
+            group = self.topic_group(topic)
+            if group is None:
+                await self.queue_frame(json.dumps({"type": "error", "topic": topic, "error": "Unknown topic"}))
+                continue
+
+            if action == "subscribe":
+                if topic not in self.groups_joined:
+                    if len(self.groups_joined) >= settings.WS_MAX_SUBSCRIPTIONS:
+                        await self.queue_frame(json.dumps({
+                            "type": "error", "topic": topic, "error": "Too many subscriptions"
+                        }))
+                        continue
+                    await self.channel_layer.group_add(group, self.channel_name)
+                    self.groups_joined[topic] = group
+                await self.queue_frame(json.dumps({"type": "subscribed", "topic": topic}))
+            else:
+                if self.groups_joined.pop(topic, None):
+                    await self.channel_layer.group_discard(group, self.channel_name)
+                await self.queue_frame(json.dumps({"type": "unsubscribed", "topic": topic}))
+
+    async def chat_message(self, event):
+        topic = f"chat:{event.get('thread_id')}"
+        await self.queue_frame(json.dumps({"type": "chat", "topic": topic, "data": event["message"]}))
+
+    async def dashboard_update(self, event):
+        frame = json.dumps(
+            {"type": "dashboard", "topic": "dashboard", "data": event["data"]}, sort_keys=True
+        )
+        await self.queue_frame(frame, key=frame)
 
+    async def vehicles_out_update(self, event):
+        await self.queue_frame(json.dumps({"type": "vehicles_out", "topic": "vehicles_out", "data": event["data"]}))
@@ -0,0 +1,134 @@
+"""
+Read-replica routing.
+
+GET / HEAD requests to views marked ``read_replica = True`` read from the
+"replica" database alias; everything else (writes, other views, Celery,
+management commands) stays on "default". Inside a transaction, or once
+the request itself wrote something, reads go back to the primary.
+
+Read-your-writes: a request that writes pins its user to the primary for
+READ_REPLICA_STICKY_SECONDS (a Redis key), so their own new message or
+approval shows up on the next list even if the replica is behind. The
+user is taken from the session or the JWT claim without a database read.
+If Redis is unreachable every read goes to the primary.
+
+Enabled from settings when DB_REPLICA_HOST (PostgreSQL) or
+DB_REPLICA_NAME (SQLite file) is set.
+"""
+import logging
+from contextvars import ContextVar
+
+import redis
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+SAFE_METHODS = ("GET", "HEAD")
+
+# per request: {"replica": reads may use the replica, "wrote": a write happened}
+_routing = ContextVar("glamth_db_routing", default=None)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state and state["replica"] and not state["wrote"]
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True   # same data on both aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+# =====================================================
+# ✅ READ-YOUR-WRITES PINNING
+# =====================================================
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.READ_REPLICA_REDIS_URL, socket_timeout=0.2)
+    return _client
+
+
+def pin_key(user_id):
+    return f"db:pinned:{user_id}"
+
+
+def pin_to_primary(user_id):
+    try:
+        get_redis().set(pin_key(user_id), 1, px=int(settings.READ_REPLICA_STICKY_SECONDS * 1000))
+    except redis.RedisError:
+        logger.warning("Replica pin store unavailable, user %s not pinned", user_id)
+
+
+def is_pinned(user_id):
+    if user_id is None:
+        return False
+    try:
+        return bool(get_redis().exists(pin_key(user_id)))
+    except redis.RedisError:
+        return True   # can't tell, so don't risk a stale read
+
+
+def request_user_id(request):
+    """Session or access-token user id, without loading the user."""
+    session = getattr(request, "session", None)
+    if session is not None and session.get(SESSION_KEY):
+        return str(session[SESSION_KEY])
+
+    parts = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return str(AccessToken(parts[1])[jwt_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # a fresh dict per request; left in place so streamed bodies read
+        # with the same routing after the view returned
+        state = {"replica": False, "wrote": False}
+        _routing.set(state)
+
+        response = self.get_response(request)
+
+        if state["wrote"]:
+            user_id = request_user_id(request)
+            if user_id is not None:
+                pin_to_primary(user_id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        if request.method in SAFE_METHODS and getattr(view_class, "read_replica", False):
+            _routing.get()["replica"] = not is_pinned(request_user_id(request))
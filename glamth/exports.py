@@ -0,0 +1,309 @@
+"""
+Streaming CSV / XLSX extracts.
+
+Rows come from a ``values_list`` projection (related columns are joined in
+the same query) read with ``iterator(chunk_size=EXPORT_CHUNK_SIZE)``, and
+are written out one chunk at a time, so memory stays flat however many
+rows are exported. XLSX is produced with the stdlib ``zipfile`` writing to
+an unseekable sink; no spreadsheet library is needed.
+"""
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import GatePass, PaymentDetail, PaymentMaster, WorkClaim, WorkThread
+from .utils import day_bounds, streaming_body
+
+
+# =====================================================
+# ✅ DATASETS: name -> (queryset, date field for ?month / ?from / ?to, columns)
+# =====================================================
+
+EXPORTS = {
+    "threads": (
+        lambda: WorkThread.objects.order_by("created_at", "id"),
+        "created_at",
+        [
+            ("Thread No", "thread_number"),
+            ("Title", "title"),
+            ("Category", "request_category__name"),
+            ("Vehicle No", "vehicle_number"),
+            ("Vehicle Type", "vehicle_type"),
+            ("Created By", "created_by__full_name"),
+            ("Status", "status"),
+            ("Approval Status", "approval_status"),
+            ("Approved By", "approved_by__full_name"),
+            ("Approved At", "approval_at"),
+            ("Created At", "created_at"),
+        ],
+    ),
+    "claims": (
+        lambda: WorkClaim.objects.order_by("created_at", "id"),
+        "created_at",
+        [
+            ("Claim ID", "id"),
+            ("Thread No", "thread__thread_number"),
+            ("Thread Title", "thread__title"),
+            ("Claim Amount", "claim_amount"),
+            ("Work Done", "work_done"),
+            ("Approval ID", "approval_id"),
+            ("Payment Status", "payment_status"),
+            ("Approved At", "approved_at"),
+            ("Paid At", "paid_at"),
+            ("Created At", "created_at"),
+        ],
+    ),
+    "gate-passes": (
+        lambda: GatePass.objects.order_by("created_at", "id"),
+        "created_at",
+        [
+            ("Gate Pass ID", "id"),
+            ("Thread No", "thread__thread_number"),
+            ("Issued To", "issued_to__full_name"),
+            ("Vehicle No", "vehicle_number"),
+            ("Mode", "pass_mode"),
+            ("Purpose", "purpose"),
+            ("Valid From", "valid_from"),
+            ("Valid To", "valid_to"),
+            ("Status", "status"),
+            ("Approved By", "approved_by__full_name"),
+            ("Out Time", "out_time"),
+            ("In Time", "in_time"),
+            ("Created At", "created_at"),
+        ],
+    ),
+    "payments": (
+        lambda: PaymentMaster.objects.order_by("created_at", "id"),
+        "created_at",
+        [
+            ("Payment ID", "id"),
+            ("Approval No", "approval__approval_no"),
+            ("Vendor", "approval__vendor_name"),
+            ("Department", "approval__department"),
+            ("Total Issue Amount", "total_issue_amount"),
+            ("Total Paid Amount", "total_paid_amount"),
+            ("Balance Amount", "balance_amount"),
+            ("Status", "overall_status"),
+            ("Remarks", "remarks"),
+            ("Created At", "created_at"),
+        ],
+    ),
+    "payment-details": (
+        lambda: PaymentDetail.objects.order_by("transaction_date", "payment_master_id", "sr_no"),
+        "transaction_date",
+        [
+            ("Payment ID", "payment_master_id"),
+            ("Approval No", "payment_master__approval__approval_no"),
+            ("Vendor", "payment_master__approval__vendor_name"),
+            ("Sr No", "sr_no"),
+            ("Amount", "amount"),
+            ("Tax", "tax"),
+            ("Total", "total"),
+            ("Transaction No", "transaction_no"),
+            ("Transaction Date", "transaction_date"),
+            ("Transaction By", "transaction_by"),
+            ("Received By", "received_by"),
+            ("Bank Status", "bank_status"),
+            ("Created At", "created_at"),
+        ],
+    ),
+}
+
+
+def date_filters(name, start, end):
+    """Filter kwargs for the dataset's date field, ``start`` / ``end`` inclusive dates."""
+    queryset, field_name, _ = EXPORTS[name]
+    field = queryset().model._meta.get_field(field_name)
+    filters = {}
+    if isinstance(field, models.DateTimeField):
+        if start:
+            filters[f"{field_name}__gte"] = day_bounds(start)[0]
+        if end:
+            filters[f"{field_name}__lt"] = day_bounds(end)[1]
+    else:
+        if start:
+            filters[f"{field_name}__gte"] = start
+        if end:
+            filters[f"{field_name}__lte"] = end
+    return filters
+
+
+def export_rows(name, filters):
+    """Header row, then one tuple per object, read in chunks."""
+    queryset, _, columns = EXPORTS[name]
+    yield tuple(header for header, _ in columns)
+    rows = queryset().filter(**filters).values_list(*(path for _, path in columns))
+    yield from rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value   # keep spreadsheets from running it as a formula
+    return value
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# =====================================================
+# ✅ CSV
+# =====================================================
+
+class _Lines:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def drain(self):
+        data = "".join(self.parts)
+        self.parts = []
+        return data.encode("utf-8")
+
+
+def stream_csv(rows):
+    sink = _Lines()
+    writer = csv.writer(sink)
+    sink.write("\ufeff")   # Excel needs the BOM to read UTF-8
+    for chunk in chunked(rows, settings.EXPORT_CHUNK_SIZE):
+        writer.writerows([cell(value) for value in row] for row in chunk)
+        yield sink.drain()
+
+
+# =====================================================
+# ✅ XLSX (single sheet, inline strings)
+# =====================================================
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# characters XML 1.0 does not allow
+XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def xlsx_cell(value):
+    value = cell(value)
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    text = escape(str(value).translate(XML_ILLEGAL))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class _ZipSink:
+    """Write-only, unseekable target so zipfile streams with data descriptors."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_xlsx(rows):
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, body in XLSX_PARTS.items():
+            archive.writestr(name, body)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            for chunk in chunked(rows, settings.EXPORT_CHUNK_SIZE):
+                sheet.write("".join(
+                    "<row>" + "".join(xlsx_cell(value) for value in row) + "</row>"
+                    for row in chunk
+                ).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield sink.drain()
+
+
+# =====================================================
+# ✅ RESPONSE
+# =====================================================
+
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def export_response(request, name, file_type, filters, filename):
+    stream, content_type = FORMATS[file_type]
+    content = streaming_body(request, stream(export_rows(name, filters)))
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{file_type}"'
+    response["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,129 @@
+"""
+Read-only, plain-dict versions of the serializers on the hottest read paths.
+
+Each function produces exactly what its DRF counterpart's ``.data`` does
+(same keys, order and value formats) but from a ``.values()`` projection
+or a single bulk lookup, skipping per-field serializer machinery and the
+per-row queries the SerializerMethodFields used to make. Equivalence is
+covered by glamth.tests.FastSerializerTests; ``manage.py bench_serializers``
+checks it on a real database and times both.
+"""
+from django.core.files.storage import default_storage
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import ThreadMessage, WorkProgressUpdate
+
+
+def drf_datetime(value):
+    """Same output as rest_framework DateTimeField (ISO 8601, 'Z' for UTC)."""
+    if not value:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def drf_string(value):
+    """Same output as rest_framework CharField: None stays None."""
+    return None if value is None else str(value)
+
+
+def latest_due_subquery():
+    return WorkProgressUpdate.objects.filter(
+        thread=OuterRef('pk')
+    ).order_by('-created_at').values('expected_end_date')[:1]
+
+
+def latest_due_dates(thread_ids):
+    """{thread_id: latest expected_end_date} in one query."""
+    due = {}
+    rows = WorkProgressUpdate.objects.filter(
+        thread_id__in=thread_ids
+    ).order_by('thread_id', 'created_at').values_list('thread_id', 'expected_end_date')
+    for thread_id, expected_end_date in rows:
+        due[thread_id] = expected_end_date
+    return due
+
+
+# =====================================================
+# ✅ TodayThreadListSerializer
+# =====================================================
+
+def serialize_today_threads(queryset):
+    if 'latest_due' not in queryset.query.annotations:
+        queryset = queryset.annotate(latest_due=Subquery(latest_due_subquery()))
+    rows = queryset.values(
+        'id', 'title', 'created_by__full_name', 'status', 'latest_due', 'description'
+    )
+    return [
+        {
+            'thread_number': row['id'],
+            'title': row['title'],
+            'created_by_name': row['created_by__full_name'],
+            'status': row['status'],
+            'due_date': row['latest_due'],
+            'description': row['description'],
+        }
+        for row in rows
+    ]
+
+
+# =====================================================
+# ✅ TodayReminderSerializer
+# =====================================================
+
+def serialize_today_reminders(reminders):
+    """
+    ``reminders`` are ReminderThread instances (recurring occurrences are
+    in-memory copies) loaded with work_thread and work_thread__created_by.
+    """
+    due = latest_due_dates({r.work_thread_id for r in reminders})
+    data = []
+    for reminder in reminders:
+        thread = reminder.work_thread
+        data.append({
+            'id': reminder.id,
+            'work_thread_number': drf_string(thread.thread_number),
+            'title': thread.title,
+            'created_by_name': thread.created_by.full_name,
+            'status': thread.status,
+            'due_date': due.get(reminder.work_thread_id),
+            'description': thread.description,
+            'reminder_at': drf_datetime(reminder.reminder_at),
+            'message': reminder.message,
+        })
+    return data
+
+
+# =====================================================
+# ✅ ThreadMessageSerializer
+# =====================================================
+
+def serialize_thread_messages(queryset):
+    rows = queryset.values(
+        'id', 'sender_id', 'sender__full_name', 'receiver_id', 'receiver__full_name',
+        'message_type', 'text_message', 'media_file', 'created_at',
+    )
+    data = []
+    for row in rows:
+        item = {
+            'id': row['id'],
+            'sender': row['sender_id'],
+            'sender_name': row['sender__full_name'],
+            'receiver': row['receiver_id'],
+        }
+        # DRF skips receiver_name entirely for group messages
+        if row['receiver_id'] is not None:
+            item['receiver_name'] = row['receiver__full_name']
+        item['message_type'] = row['message_type']
+        item['text_message'] = row['text_message']
+        item['media_file'] = default_storage.url(row['media_file']) if row['media_file'] else None
+        item['created_at'] = drf_datetime(row['created_at'])
+        data.append(item)
+    return data
+
+
+def thread_messages(thread_id):
+    return ThreadMessage.objects.filter(thread_id=thread_id).order_by('id')
@@ -0,0 +1,436 @@
+"""
+Bulk import of historic approvals and payment ledgers.
+
+One sheet (CSV or XLSX) with a header row; the ``record`` column says what
+each row is, the other columns are the fields of the matching serializer
+in glamth.serializers:
+
+  approval  ApprovalImportSerializer       Approval, upserted on approval_no.
+                                           total_issue_amount / payment_remarks
+                                           set its payment master.
+  flow      ApprovalFlowImportSerializer   a flow level; the approval's levels
+                                           are replaced by the imported ones
+  payment   PaymentDetailImportSerializer  a transaction on the approval's
+                                           payment master, upserted on sr_no
+
+Blank cells and missing columns leave the stored value alone when a row
+updates an existing approval or transaction; they take the serializer's
+default only when the row creates one.
+
+The file is read as a stream and handled IMPORT_CHUNK_SIZE rows at a time:
+rows are validated, then written with a handful of set-based queries per
+chunk, each chunk in its own transaction. Invalid rows are skipped and
+reported by row number. A dry run does all the work inside one
+transaction and rolls it back, so references between rows are checked
+as well.
+
+Through the import an approval has one payment master, created on first
+use (the oldest one if it already has several).
+"""
+import csv
+import io
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import defaultdict
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from .exports import chunked
+from .models import (
+    MONEY, Approval, ApprovalFlow, PaymentDetail, PaymentMaster, WorkThread,
+    mark_rollup_months, money, payment_status, payment_status_case,
+)
+from .serializers import (
+    ApprovalFlowImportSerializer, ApprovalImportSerializer, PaymentDetailImportSerializer,
+)
+
+
+RECORDS = {
+    "approval": ApprovalImportSerializer,
+    "flow": ApprovalFlowImportSerializer,
+    "payment": PaymentDetailImportSerializer,
+}
+
+# Approval columns written by the upsert (approval_no is the conflict key)
+APPROVAL_FIELDS = [
+    name for name in ApprovalImportSerializer().fields
+    if name not in ("approval_no", "work_thread", "total_issue_amount", "payment_remarks")
+]
+PAYMENT_FIELDS = [name for name in PaymentDetailImportSerializer().fields if name != "approval_no"]
+
+# validated data key: the columns the row actually filled in
+COLUMNS = "_columns"
+PARTIAL_RECORDS = ("approval", "payment")
+
+FORMATS = ("csv", "xlsx")
+
+
+# =====================================================
+# ✅ READERS: (row number, {column: value})
+# =====================================================
+
+def header_key(value):
+    return re.sub(r"[\s\-]+", "_", str(value or "").strip().lower())
+
+
+def read_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    for number, row in enumerate(csv.reader(text), start=1):
+        yield number, row
+
+
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+CELL_REF_RE = re.compile(r"^([A-Z]+)")
+
+
+def column_index(ref):
+    index = 0
+    for letter in CELL_REF_RE.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def xlsx_number(text):
+    """Cell numbers are binary floats: 12.300000000000001 -> "12.3"."""
+    try:
+        return f"{float(text):.10f}".rstrip("0").rstrip(".")
+    except ValueError:
+        return text
+
+
+def read_xlsx(fileobj):
+    """First worksheet, row by row (iterparse), no spreadsheet library needed."""
+    with zipfile.ZipFile(fileobj) as book:
+        names = book.namelist()
+
+        shared = []
+        if "xl/sharedStrings.xml" in names:
+            with book.open("xl/sharedStrings.xml") as part:
+                for _, element in ET.iterparse(part):
+                    if element.tag == XLSX_NS + "si":
+                        shared.append("".join(t.text or "" for t in element.iter(XLSX_NS + "t")))
+                        element.clear()
+
+        sheets = sorted(n for n in names if n.startswith("xl/worksheets/") and n.endswith(".xml"))
+        sheet = "xl/worksheets/sheet1.xml" if "xl/worksheets/sheet1.xml" in names else sheets[0]
+
+        with book.open(sheet) as part:
+            for _, element in ET.iterparse(part):
+                if element.tag != XLSX_NS + "row":
+                    continue
+                values = {}
+                for position, c in enumerate(element.iter(XLSX_NS + "c")):
+                    kind = c.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in c.iter(XLSX_NS + "t"))
+                    else:
+                        v = c.find(XLSX_NS + "v")
+                        value = (v.text or "") if v is not None else ""
+                        if kind == "s":
+                            value = shared[int(value)]
+                        elif kind == "b":
+                            value = "TRUE" if value == "1" else "FALSE"
+                        elif kind in (None, "n") and value:
+                            value = xlsx_number(value)
+                    values[column_index(c.get("r")) if c.get("r") else position] = value
+                number = int(element.get("r") or 0)
+                element.clear()
+                yield number, [values.get(i, "") for i in range(max(values) + 1)] if values else []
+
+
+def read_rows(fileobj, file_type):
+    """Data rows as dicts keyed by the normalised header; blank cells left out."""
+    rows = read_csv(fileobj) if file_type == "csv" else read_xlsx(fileobj)
+    header = None
+    for number, values in rows:
+        if header is None:
+            header = [header_key(value) for value in values]
+            continue
+        row = {
+            key: str(value).strip()
+            for key, value in zip(header, values)
+            if key and str(value).strip()
+        }
+        if row:
+            yield number, row
+
+
+# =====================================================
+# ✅ IMPORT
+# =====================================================
+
+class LedgerImport:
+
+    def __init__(self, dry_run=False, chunk_size=None):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.counts = dict.fromkeys((
+            "rows",
+            "approvals_created", "approvals_updated",
+            "flows",
+            "payment_masters_created", "payment_masters_updated",
+            "transactions_created", "transactions_updated", "transactions_unchanged",
+        ), 0)
+        self.errors = []
+        self.error_count = 0
+        self.flows_replaced = set()   # approvals whose old flow levels are already gone
+        self.validators = {record: serializer() for record, serializer in RECORDS.items()}
+
+    def error(self, number, errors):
+        self.error_count += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append({"row": number, "errors": errors})
+
+    def run(self, rows):
+        with transaction.atomic() if self.dry_run else nullcontext():
+            for chunk in chunked(rows, self.chunk_size):
+                with transaction.atomic():
+                    self.import_chunk(chunk)
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        return {
+            "dry_run": self.dry_run,
+            **self.counts,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+    def import_chunk(self, chunk):
+        valid = {record: [] for record in RECORDS}
+        for number, row in chunk:
+            self.counts["rows"] += 1
+            record = row.pop("record", "").lower()
+            if record not in RECORDS:
+                self.error(number, {"record": [f"Expected one of: {', '.join(RECORDS)}."]})
+                continue
+            try:
+                # one serializer per record type: building the fields is
+                # most of the cost of validating a row
+                data = self.validators[record].run_validation(row)
+            except serializers.ValidationError as exc:
+                self.error(number, serializers.as_serializer_error(exc))
+                continue
+            data = dict(data)
+            if record in PARTIAL_RECORDS:
+                data[COLUMNS] = set(row)
+            valid[record].append((number, data))
+
+        issue = self.save_approvals(valid["approval"])
+
+        referenced = {data["approval_no"] for rows in valid.values() for _, data in rows}
+        approval_ids = dict(
+            Approval.objects.filter(approval_no__in=referenced).values_list("approval_no", "id")
+        )
+        payments = self.resolve(valid["payment"], approval_ids)
+        masters = self.save_masters(
+            {approval_ids[no]: values for no, values in issue.items() if no in approval_ids},
+            {approval_id for _, approval_id, _ in payments},
+        )
+
+        self.save_flows(self.resolve(valid["flow"], approval_ids))
+        self.save_payments(payments, masters)
+
+    def resolve(self, rows, approval_ids):
+        resolved = []
+        for number, data in rows:
+            approval_id = approval_ids.get(data.pop("approval_no"))
+            if approval_id is None:
+                self.error(number, {"approval_no": ["Unknown approval."]})
+                continue
+            resolved.append((number, approval_id, data))
+        return resolved
+
+    def save_approvals(self, rows):
+        """Upsert on approval_no. Returns {approval_no: (issue amount, remarks)} to apply."""
+        if not rows:
+            return {}
+        threads = dict(
+            WorkThread.objects.filter(
+                thread_number__in={data["work_thread"] for _, data in rows}
+            ).values_list("thread_number", "id")
+        )
+
+        latest = {}
+        for number, data in rows:
+            if data["work_thread"] not in threads:
+                self.error(number, {"work_thread": ["Unknown thread number."]})
+                continue
+            previous = latest.get(data["approval_no"])
+            if previous is not None:
+                # a later row for the same approval wins, column by column
+                data = {
+                    **previous,
+                    **{name: data[name] for name in data[COLUMNS] if name in data},
+                    COLUMNS: previous[COLUMNS] | data[COLUMNS],
+                }
+            latest[data["approval_no"]] = data
+        if not latest:
+            return {}
+
+        # one upsert per set of filled-in columns, so an update only
+        # writes what its row has
+        groups = defaultdict(list)
+        for approval_no, data in latest.items():
+            groups[tuple(name for name in APPROVAL_FIELDS if name in data[COLUMNS])].append(data)
+
+        existing = list(Approval.objects.filter(approval_no__in=latest).values_list("id", flat=True))
+        for fields, group in groups.items():
+            Approval.objects.bulk_create(
+                [
+                    Approval(
+                        approval_no=data["approval_no"],
+                        work_thread_id=threads[data["work_thread"]],
+                        **{name: data.get(name) for name in APPROVAL_FIELDS},
+                    )
+                    for data in group
+                ],
+                update_conflicts=True,
+                unique_fields=["approval_no"],
+                update_fields=["work_thread", *fields],
+            )
+        self.counts["approvals_created"] += len(latest) - len(existing)
+        self.counts["approvals_updated"] += len(existing)
+
+        # department / vendor may have changed under already-rolled-up payments
+        if existing:
+            mark_rollup_months(
+                *PaymentMaster.objects.filter(approval_id__in=existing).values_list("created_at", flat=True),
+                *PaymentDetail.objects.filter(
+                    payment_master__approval_id__in=existing
+                ).values_list("transaction_date", flat=True),
+            )
+
+        return {
+            approval_no: (data.get("total_issue_amount"), data.get("payment_remarks"))
+            for approval_no, data in latest.items()
+            if "total_issue_amount" in data or "payment_remarks" in data
+        }
+
+    def save_masters(self, issue, needed):
+        """{approval_id: payment master id}, creating masters and applying issue amounts."""
+        needed = set(needed) | set(issue)
+        if not needed:
+            return {}
+
+        masters = {}
+        for approval_id, master_id in PaymentMaster.objects.filter(
+            approval_id__in=needed
+        ).order_by("created_at", "id").values_list("approval_id", "id"):
+            masters.setdefault(approval_id, master_id)
+
+        created = []
+        for approval_id in needed - set(masters):
+            amount, remarks = issue.get(approval_id, (None, None))
+            amount = amount or 0
+            created.append(PaymentMaster(
+                approval_id=approval_id,
+                total_issue_amount=amount,
+                total_paid_amount=0,
+                balance_amount=amount,
+                overall_status=payment_status(0, amount),
+                remarks=remarks,
+            ))
+        if created:
+            PaymentMaster.objects.bulk_create(created)
+            masters.update((master.approval_id, master.id) for master in created)
+            mark_rollup_months(timezone.now())
+            self.counts["payment_masters_created"] += len(created)
+
+        new_ids = {master.id for master in created}
+        updates = {
+            masters[approval_id]: values
+            for approval_id, values in issue.items()
+            if masters[approval_id] not in new_ids
+        }
+        if updates:
+            amount = Case(
+                *(When(pk=pk, then=Value(value, output_field=MONEY))
+                  for pk, (value, _) in updates.items() if value is not None),
+                default=F("total_issue_amount"),
+                output_field=MONEY,
+            )
+            remarks = Case(
+                *(When(pk=pk, then=Value(value)) for pk, (_, value) in updates.items() if value is not None),
+                default=F("remarks"),
+            )
+            PaymentMaster.objects.filter(pk__in=updates).update(
+                total_issue_amount=amount,
+                remarks=remarks,
+                balance_amount=money(amount - F("total_paid_amount")),
+                overall_status=payment_status_case(F("total_paid_amount"), amount),
+                updated_at=timezone.now(),
+            )
+            mark_rollup_months(
+                *PaymentMaster.objects.filter(pk__in=updates).values_list("created_at", flat=True)
+            )
+            self.counts["payment_masters_updated"] += len(updates)
+
+        return masters
+
+    def save_flows(self, rows):
+        if not rows:
+            return
+        flows = [ApprovalFlow(approval_id=approval_id, **data) for _, approval_id, data in rows]
+        replace = {flow.approval_id for flow in flows} - self.flows_replaced
+        ApprovalFlow.objects.filter(approval_id__in=replace).delete()
+        self.flows_replaced |= replace
+        ApprovalFlow.objects.bulk_create(flows)
+        self.counts["flows"] += len(flows)
+
+    def save_payments(self, rows, masters):
+        if not rows:
+            return
+        latest = {}
+        for _, approval_id, data in rows:
+            key = (masters[approval_id], data["sr_no"])
+            if key in latest:
+                data = {
+                    **latest[key],
+                    **{name: data[name] for name in data[COLUMNS] if name in data},
+                    COLUMNS: latest[key][COLUMNS] | data[COLUMNS],
+                }
+            latest[key] = data
+
+        existing = {}
+        for pk, master_id, *values in PaymentDetail.objects.filter(
+            payment_master_id__in={master_id for master_id, _ in latest}
+        ).values_list("pk", "payment_master_id", *PAYMENT_FIELDS):
+            existing[(master_id, values[PAYMENT_FIELDS.index("sr_no")])] = (pk, dict(zip(PAYMENT_FIELDS, values)))
+
+        created, updated, changed_fields = [], [], set()
+        for (master_id, sr_no), data in latest.items():
+            pk, stored = existing.get((master_id, sr_no), (None, None))
+            if stored is None:
+                values = {name: data.get(name) for name in PAYMENT_FIELDS}
+                created.append(PaymentDetail(payment_master_id=master_id, **values))
+                continue
+
+            columns = data[COLUMNS]
+            values = {**stored, **{name: data[name] for name in PAYMENT_FIELDS if name in columns}}
+            if "total" not in columns and columns & {"amount", "tax"}:
+                values["total"] = values["amount"] + values["tax"]
+            changed = {name for name in PAYMENT_FIELDS if values[name] != stored[name]}
+            if changed:
+                # re-imports mostly repeat what is stored; write only real changes
+                updated.append(PaymentDetail(pk=pk, payment_master_id=master_id, **values))
+                changed_fields |= changed
+
+        # the queryset keeps master totals and finance rollups in step
+        if created:
+            PaymentDetail.objects.bulk_create(created)
+        if updated:
+            PaymentDetail.objects.bulk_update(updated, sorted(changed_fields))
+        self.counts["transactions_created"] += len(created)
+        self.counts["transactions_updated"] += len(updated)
+        self.counts["transactions_unchanged"] += len(latest) - len(created) - len(updated)
+
+
+def import_ledger(fileobj, file_type, dry_run=False, chunk_size=None):
+    return LedgerImport(dry_run=dry_run, chunk_size=chunk_size).run(read_rows(fileobj, file_type))
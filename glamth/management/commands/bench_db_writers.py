@@ -0,0 +1,123 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from glamth.models import ThreadMessage, WorkThread
+from glamth.tasks import send_push_to_subscription
+from glamth.views import SendThreadMessageAPIView
+
+
+MEMORY_LAYER = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+}
+
+
+def database_profile():
+    db = settings.DATABASES["default"]
+    profile = {
+        "engine": db["ENGINE"].rsplit(".", 1)[-1],
+        "conn_max_age": db.get("CONN_MAX_AGE", 0),
+        "pool": db.get("OPTIONS", {}).get("pool"),
+    }
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout"):
+                cursor.execute(f"PRAGMA {pragma}")
+                profile[pragma] = cursor.fetchone()[0]
+        profile["transaction_mode"] = db.get("OPTIONS", {}).get("transaction_mode")
+    return profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark simultaneous writers on SendThreadMessageAPIView against the "
+        "configured database (DB_ENGINE / DB_* settings): messages per second, "
+        "latency and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--thread", type=int, default=None,
+                            help="WorkThread id to post into (default: the newest thread)")
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--writers", type=int, default=16,
+                            help="Simulated requests writing at the same time")
+        parser.add_argument("--with-push", action="store_true",
+                            help="Also queue web push jobs (needs the Celery broker)")
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the benchmark messages (deleted by default)")
+
+    def handle(self, *args, **options):
+        thread = (
+            WorkThread.objects.filter(pk=options["thread"]) if options["thread"]
+            else WorkThread.objects.order_by("-id")
+        ).select_related("created_by").first()
+        if thread is None:
+            raise CommandError("No WorkThread to post into")
+
+        factory = APIRequestFactory()
+        view = SendThreadMessageAPIView.as_view()
+        user = thread.created_by
+
+        def send(index):
+            # what request_started / request_finished do around a real request:
+            # connections older than CONN_MAX_AGE (or broken) are closed
+            close_old_connections()
+            started = time.perf_counter()
+            request = factory.post("/api/messages/send/", {
+                "thread": thread.id,
+                "message_type": "text",
+                "text_message": f"bench {index}",
+            }, format="json")
+            force_authenticate(request, user=user)
+            try:
+                response = view(request)
+                result = response.status_code, response.data.get("data", {}).get("id"), None
+            except DatabaseError as exc:
+                result = "error", None, str(exc)
+            finally:
+                close_old_connections()
+            return (*result, time.perf_counter() - started)
+
+        push = nullcontext() if options["with_push"] else mock.patch.object(send_push_to_subscription, "delay")
+        with override_settings(CHANNEL_LAYERS=MEMORY_LAYER), push:
+            warm_up = send(-1)   # imports, first connection
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["writers"]) as pool:
+                results = list(pool.map(send, range(options["messages"])))
+            elapsed = time.perf_counter() - started
+
+        codes, errors, created = {}, {}, []
+        for code, message_id, error, _ in results:
+            codes[str(code)] = codes.get(str(code), 0) + 1
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+            if message_id:
+                created.append(message_id)
+        latencies = sorted(seconds for *_, seconds in results)
+
+        if not options["keep"]:
+            ThreadMessage.objects.filter(pk__in=[warm_up[1], *created]).delete()
+
+        self.stdout.write(json.dumps({
+            "database": database_profile(),
+            "messages": options["messages"],
+            "writers": options["writers"],
+            "status_codes": codes,
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 2),
+            "messages_per_second": round(len(created) / elapsed, 1),
+            "latency_ms": {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p99": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+            },
+        }, indent=2, default=str))
@@ -0,0 +1,65 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from glamth.views import LoginAPIView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark LoginAPIView: logins per second for this process and per "
+        "hashing worker (LOGIN_HASH_WORKERS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=16,
+                            help="Simulated request workers hitting the view at once")
+        parser.add_argument("--throttle", action="store_true",
+                            help="Keep the Redis login throttles on (off by default)")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view_kwargs = {} if options["throttle"] else {"throttle_classes": []}
+        view = LoginAPIView.as_view(**view_kwargs)
+        body = {"email": options["email"], "password": options["password"]}
+
+        def login(_):
+            started = time.perf_counter()
+            request = factory.post("/api/login/", body, format="json")
+            response = view(request)
+            return response.status_code, time.perf_counter() - started
+
+        if login(None)[0] != 200:
+            raise CommandError("Warm-up login failed; check --email / --password")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(login, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        codes = {}
+        for code, _ in results:
+            codes[code] = codes.get(code, 0) + 1
+        latencies = sorted(seconds for _, seconds in results)
+        ok = codes.get(200, 0)
+
+        self.stdout.write(json.dumps({
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "hash_workers": settings.LOGIN_HASH_WORKERS,
+            "status_codes": codes,
+            "elapsed_seconds": round(elapsed, 2),
+            "logins_per_second": round(ok / elapsed, 1),
+            "logins_per_second_per_worker": round(ok / elapsed / settings.LOGIN_HASH_WORKERS, 1),
+            "latency_ms": {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p99": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+            },
+        }, indent=2))
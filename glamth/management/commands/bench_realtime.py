@@ -0,0 +1,260 @@
+import asyncio
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from glamth.outbound import OUTBOUND_STATS
+from glamth.realtime import notify_dashboard, notify_chat
+
+
+User = get_user_model()
+
+MEMORY_LAYER = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {"capacity": 1000},
+    },
+}
+
+
+class WebsocketClient(ApplicationCommunicator):
+    """
+    Minimal simulated WebSocket client (channels.testing pulls in daphne).
+    """
+
+    def __init__(self, application, path):
+        path, _, query = path.partition("?")
+        super().__init__(application, {
+            "type": "websocket",
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [],
+            "subprotocols": [],
+        })
+
+    async def connect(self, timeout=1):
+        await self.send_input({"type": "websocket.connect"})
+        response = await self.receive_output(timeout)
+        return response["type"] == "websocket.accept"
+
+    async def disconnect(self, code=1000, timeout=1):
+        await self.send_input({"type": "websocket.disconnect", "code": code})
+        await self.wait(timeout)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the realtime tier: opens simulated ws/dashboard/ and "
+        "ws/chat/<id>/ clients against the ASGI application and drives "
+        "notify_dashboard / notify_chat at a fixed rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layer", choices=["memory", "redis"], default="memory",
+                            help="memory = InMemoryChannelLayer, redis = settings.CHANNEL_LAYERS")
+        parser.add_argument("--dashboard-clients", type=int, default=1000)
+        parser.add_argument("--chat-clients", type=int, default=1000)
+        parser.add_argument("--threads", type=int, default=20,
+                            help="Number of chat rooms the chat clients are spread over")
+        parser.add_argument("--users", type=int, default=50,
+                            help="Number of existing active users to authenticate as")
+        parser.add_argument("--dashboard-rate", type=float, default=10.0,
+                            help="notify_dashboard calls per second")
+        parser.add_argument("--chat-rate", type=float, default=10.0,
+                            help="notify_chat calls per second")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to drive events")
+        parser.add_argument("--grace", type=float, default=2.0,
+                            help="Seconds to wait for in-flight frames after driving stops")
+        parser.add_argument("--connect-batch", type=int, default=200)
+
+    def handle(self, *args, **options):
+        layers = MEMORY_LAYER if options["layer"] == "memory" else settings.CHANNEL_LAYERS
+
+        with override_settings(CHANNEL_LAYERS=layers):
+            report = asyncio.run(self.run(options))
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    # --------------------------------------------------
+    # CLIENTS
+    # --------------------------------------------------
+    async def connect_clients(self, application, paths, batch):
+        clients = []
+        for start in range(0, len(paths), batch):
+            chunk = [WebsocketClient(application, path) for path in paths[start:start + batch]]
+            results = await asyncio.gather(*(c.connect(timeout=30) for c in chunk))
+            for client, connected in zip(chunk, results):
+                if not connected:
+                    raise CommandError("WebSocket connection rejected (check the bench users' tokens)")
+                clients.append(client)
+        return clients
+
+    async def drain(self, client, group, sent_at, latencies, received, coalesced):
+        # Channel layers are FIFO per channel, so the n-th frame a client
+        # receives belongs to the n-th send to its group. Coalesced dashboard
+        # frames answer every send made before they arrived, so latency is
+        # measured from the oldest send still waiting.
+        index = 0
+        while True:
+            await client.receive_output(timeout=3600)
+            now = time.perf_counter()
+            sends = sent_at[group]
+            if index < len(sends):
+                latencies.append(now - sends[index])
+            index += 1
+            if coalesced:
+                while index < len(sends) and sends[index] <= now:
+                    index += 1
+            received[group] += 1
+
+    # --------------------------------------------------
+    # BENCH
+    # --------------------------------------------------
+    async def run(self, options):
+        from glathread.asgi import application
+
+        users = await sync_to_async(list)(
+            User.objects.filter(is_active=True).order_by("id")[:options["users"]]
+        )
+        if not users:
+            raise CommandError("At least one active user is required to open authenticated sockets")
+
+        tokens = {user.id: str(AccessToken.for_user(user)) for user in users}
+        user_ids = list(tokens)
+        thread_ids = list(range(1, options["threads"] + 1))
+
+        dashboard_groups, dashboard_paths = [], []
+        for i in range(options["dashboard_clients"]):
+            uid = user_ids[i % len(user_ids)]
+            dashboard_groups.append(f"dashboard_{uid}")
+            dashboard_paths.append(f"/ws/dashboard/?token={tokens[uid]}")
+
+        chat_groups, chat_paths = [], []
+        for i in range(options["chat_clients"]):
+            uid = user_ids[i % len(user_ids)]
+            tid = thread_ids[i % len(thread_ids)]
+            chat_groups.append(f"chat_{tid}")
+            chat_paths.append(f"/ws/chat/{tid}/?token={tokens[uid]}")
+
+        # ===============================
+        # ✅ CONNECT + MEMORY PER CONNECTION
+        # ===============================
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        connect_started = time.perf_counter()
+
+        clients = await self.connect_clients(
+            application, dashboard_paths + chat_paths, options["connect_batch"]
+        )
+
+        connect_seconds = time.perf_counter() - connect_started
+        connected_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        groups = dashboard_groups + chat_groups
+        members = defaultdict(int)
+        for group in groups:
+            members[group] += 1
+
+        sent_at = defaultdict(list)
+        received = defaultdict(int)
+        latencies = {"dashboard": [], "chat": []}
+
+        drainers = [
+            asyncio.ensure_future(self.drain(
+                client, group, sent_at,
+                latencies["chat" if group.startswith("chat_") else "dashboard"],
+                received, group.startswith("dashboard_"),
+            ))
+            for client, group in zip(clients, groups)
+        ]
+
+        # ===============================
+        # ✅ DRIVE EVENTS
+        # ===============================
+        send_dashboard = sync_to_async(notify_dashboard)
+        send_chat = sync_to_async(notify_chat)
+
+        schedule = []
+        if options["dashboard_clients"] and options["dashboard_rate"] > 0:
+            count = int(options["dashboard_rate"] * options["duration"])
+            schedule += [(i / options["dashboard_rate"], "dashboard", i) for i in range(count)]
+        if options["chat_clients"] and options["chat_rate"] > 0:
+            count = int(options["chat_rate"] * options["duration"])
+            schedule += [(i / options["chat_rate"], "chat", i) for i in range(count)]
+        schedule.sort()
+
+        events = {"dashboard": 0, "chat": 0}
+        drive_started = time.perf_counter()
+
+        for offset, kind, seq in schedule:
+            delay = drive_started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if kind == "dashboard":
+                uid = user_ids[seq % len(user_ids)]
+                sent_at[f"dashboard_{uid}"].append(time.perf_counter())
+                await send_dashboard([uid])
+            else:
+                tid = thread_ids[seq % len(thread_ids)]
+                sent_at[f"chat_{tid}"].append(time.perf_counter())
+                await send_chat(tid, {"event": "bench", "seq": seq})
+            events[kind] += 1
+
+        drive_seconds = time.perf_counter() - drive_started
+        await asyncio.sleep(options["grace"])
+
+        for task in drainers:
+            task.cancel()
+        await asyncio.gather(*drainers, return_exceptions=True)
+        await asyncio.gather(*(c.disconnect() for c in clients), return_exceptions=True)
+
+        # ===============================
+        # ✅ REPORT
+        # ===============================
+        def section(kind):
+            kind_groups = [g for g in members if g.startswith(f"{kind}_")]
+            expected = sum(len(sent_at[g]) * members[g] for g in kind_groups)
+            delivered = sum(min(received[g], len(sent_at[g]) * members[g]) for g in kind_groups)
+            values = latencies[kind]
+            return {
+                "events_sent": events[kind],
+                "frames_expected": expected,
+                "frames_delivered": delivered,
+                "delivery_ratio": round(delivered / expected, 4) if expected else None,
+                "frames_per_second": round(delivered / drive_seconds, 1) if drive_seconds else None,
+                "latency_ms": {
+                    name: round(percentile(values, pct) * 1000, 2) if values else None
+                    for name, pct in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+                },
+            }
+
+        return {
+            "layer": options["layer"],
+            "connections": len(clients),
+            "connect_seconds": round(connect_seconds, 2),
+            "memory_per_connection_kb": round((connected_bytes - baseline) / len(clients) / 1024, 2)
+            if clients else None,
+            "drive_seconds": round(drive_seconds, 2),
+            "dashboard": section("dashboard"),
+            "chat": section("chat"),
+            "outbound": dict(OUTBOUND_STATS),
+        }
@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from glamth.fast_serializers import (
+    serialize_thread_messages, serialize_today_reminders, serialize_today_threads,
+)
+from glamth.models import ReminderThread, ThreadMessage, WorkThread
+from glamth.renderers import ORJSONRenderer, orjson
+from glamth.serializers import (
+    ThreadMessageSerializer, TodayReminderSerializer, TodayThreadListSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the plain-dict serializers and ORJSONRenderer produce the "
+        "same JSON as the DRF ones, then time both on the current database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Rows per payload")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def cases(self, rows):
+        threads = WorkThread.objects.order_by("-created_at")
+        thread_ids = list(threads.values_list("id", flat=True)[:rows])
+        reminders = ReminderThread.objects.select_related(
+            "work_thread", "work_thread__created_by"
+        ).order_by("reminder_at", "id")
+        messages = ThreadMessage.objects.order_by("id")
+        message_ids = list(messages.values_list("id", flat=True)[:rows])
+
+        return {
+            "today_threads": (
+                lambda: TodayThreadListSerializer(
+                    threads.filter(id__in=thread_ids).select_related("created_by"), many=True
+                ).data,
+                lambda: serialize_today_threads(threads.filter(id__in=thread_ids)),
+            ),
+            "today_reminders": (
+                lambda: TodayReminderSerializer(list(reminders[:rows]), many=True).data,
+                lambda: serialize_today_reminders(list(reminders[:rows])),
+            ),
+            "thread_messages": (
+                lambda: ThreadMessageSerializer(
+                    messages.filter(id__in=message_ids).select_related("sender", "receiver"),
+                    many=True,
+                ).data,
+                lambda: serialize_thread_messages(messages.filter(id__in=message_ids)),
+            ),
+        }
+
+    def timed(self, func, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            result = func()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return result, {
+            "ms": round((time.perf_counter() - started) / repeat * 1000, 2),
+            "queries": len(queries),
+        }
+
+    def handle(self, *args, **options):
+        stdlib = JSONRenderer()
+        fast = ORJSONRenderer()
+        repeat = options["repeat"]
+        report = {"orjson_installed": orjson is not None}
+        mismatches = []
+
+        for name, (drf, plain) in self.cases(options["rows"]).items():
+            drf_data, drf_stats = self.timed(drf, repeat)
+            plain_data, plain_stats = self.timed(plain, repeat)
+
+            drf_json = stdlib.render(drf_data)
+            if stdlib.render(plain_data) != drf_json:
+                mismatches.append(f"{name}: plain-dict output differs from the DRF serializer")
+            if fast.render(plain_data) != drf_json:
+                mismatches.append(f"{name}: ORJSONRenderer output differs from JSONRenderer")
+
+            _, stdlib_stats = self.timed(lambda: stdlib.render(plain_data), repeat)
+            _, fast_stats = self.timed(lambda: fast.render(plain_data), repeat)
+
+            report[name] = {
+                "rows": len(drf_data),
+                "bytes": len(drf_json),
+                "drf_serializer": drf_stats,
+                "plain_serializer": plain_stats,
+                "json_renderer_ms": stdlib_stats["ms"],
+                "orjson_renderer_ms": fast_stats["ms"],
+            }
+
+        self.stdout.write(json.dumps(report, indent=2))
+        if mismatches:
+            raise CommandError("; ".join(mismatches))
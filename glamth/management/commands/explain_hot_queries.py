@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from glamth.models import (
+    GatePass, ReminderThread, User, WorkClaim, WorkThread,
+)
+from glamth.tasks import DELAYABLE_STATUSES, overdue_threads
+from glamth.utils import day_bounds
+
+
+class Command(BaseCommand):
+    help = "Print the database EXPLAIN plan for each hot query in glamth/views.py."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="User id for per-user queries (default: first user)")
+        parser.add_argument("--only", help="Run a single query by name")
+        parser.add_argument("--analyze", action="store_true",
+                            help="Pass ANALYZE to EXPLAIN (PostgreSQL only)")
+
+    def hot_queries(self, user):
+        today = timezone.now().date()
+        today_start, today_end = day_bounds(today)
+
+        return {
+            # DashboardCountAPIView
+            "dashboard_pending": WorkThread.objects.filter(status='pending', approval_status='pending'),
+            "dashboard_status": WorkThread.objects.filter(status='working'),
+            "dashboard_rejected": WorkThread.objects.filter(approval_status='rejected'),
+            "dashboard_overdue": overdue_threads(today),
+            "delayed_sweep_candidates": overdue_threads(today).filter(status__in=DELAYABLE_STATUSES)[:500],
+            "dashboard_todays_work": WorkThread.objects.filter(
+                created_at__gte=today_start, created_at__lt=today_end
+            ),
+            "dashboard_todays_reminders": ReminderThread.objects.filter(
+                created_by=user, reminder_at__gte=today_start, reminder_at__lt=today_end
+            ).order_by("reminder_at"),
+            # Gate passes / claims
+            "gatepass_out_past_valid_to": GatePass.objects.filter(
+                status='out', valid_to__lt=timezone.now()
+            ),
+            "workclaim_by_payment_status": WorkClaim.objects.filter(
+                payment_status='pending'
+            ).order_by('-created_at'),
+            # WorkThreadListAPIView keyset page
+            "thread_list": WorkThread.objects.filter(
+                status__in=['pending', 'working']
+            ).order_by('-created_at', '-id')[:50],
+            # Viewset list pages
+            "gatepass_list": GatePass.objects.order_by('-created_at', '-id')[:50],
+            "reminder_list": ReminderThread.objects.order_by('-reminder_at', '-id')[:50],
+        }
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(id=options["user"]).first()
+        else:
+            user = User.objects.order_by("id").first()
+        if user is None:
+            raise CommandError("No user found for per-user queries")
+
+        queries = self.hot_queries(user)
+        if options["only"]:
+            if options["only"] not in queries:
+                raise CommandError(f"Unknown query, choose from: {', '.join(queries)}")
+            queries = {options["only"]: queries[options["only"]]}
+
+        explain_options = {"analyze": True} if options["analyze"] else {}
+
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
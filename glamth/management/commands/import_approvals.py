@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from glamth.imports import FORMATS, import_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import approvals, flow levels and payment transactions from a "
+        ".csv / .xlsx sheet (row layout in glamth.imports)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Validate and report, write nothing")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_type = path.rsplit(".", 1)[-1].lower()
+        if file_type not in FORMATS:
+            raise CommandError("Expected a .csv or .xlsx file")
+
+        with open(path, "rb") as f:
+            result = import_ledger(
+                f, file_type,
+                dry_run=options["dry_run"],
+                chunk_size=options["chunk_size"],
+            )
+        self.stdout.write(json.dumps(result, indent=2, default=str))
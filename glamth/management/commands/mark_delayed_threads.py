@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from glamth.tasks import mark_overdue_threads_delayed
+
+
+class Command(BaseCommand):
+    help = "Move overdue open threads to 'delayed' now (same job Celery beat runs nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        result = mark_overdue_threads_delayed(batch_size=options["batch_size"])
+        self.stdout.write(
+            f"Delayed {result['delayed']} threads, notified {result['users_notified']} users"
+        )
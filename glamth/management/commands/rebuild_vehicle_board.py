@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from glamth.tasks import rebuild_vehicle_board
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Redis vehicles-out board from GatePass rows (same job Celery beat runs hourly)."
+
+    def handle(self, *args, **options):
+        result = rebuild_vehicle_board()
+        self.stdout.write(f"Vehicle board rebuilt: {result['vehicles_out']} outside")
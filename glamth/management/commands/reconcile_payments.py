@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from glamth.tasks import reconcile_payment_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-aggregate PaymentDetail totals and report PaymentMasters whose "
+        "stored totals drifted (same job Celery beat runs nightly with --fix)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true",
+                            help="Write the re-aggregated totals back (default: report only)")
+
+    def handle(self, *args, **options):
+        result = reconcile_payment_totals(fix=options["fix"])
+        for row in result["drifted"]:
+            self.stdout.write(
+                f"PaymentMaster {row['id']}: stored paid {row['total_paid_amount']}, "
+                f"actual {row['actual_paid']} (balance {row['balance_amount']}, "
+                f"status {row['overall_status']})"
+            )
+        self.stdout.write(f"{len(result['drifted'])} drifted, {result['fixed']} fixed")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from glamth.tasks import rebuild_finance_rollups, refresh_finance_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-aggregate finance rollups for months with changed claims / payments "
+        "(same job Celery beat runs every few minutes). --all rebuilds every month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Rebuild all months (the nightly job)")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            result = rebuild_finance_rollups()
+            self.stdout.write(f"Finance rollups rebuilt: {result['rows']} rows")
+        else:
+            result = refresh_finance_rollups()
+            self.stdout.write(f"Refreshed months: {', '.join(result['months']) or 'none'}")
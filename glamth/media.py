@@ -0,0 +1,188 @@
+"""
+Authenticated media serving.
+
+The permission check always runs in Django. Sending the bytes depends on
+MEDIA_SERVE_MODE:
+
+  "django"      streamed from this process, with byte ranges, ETag and
+                conditional GET
+  "x-accel"     nginx sends it: X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an
+                ``internal`` location aliased to MEDIA_ROOT
+  "x-sendfile"  Apache (mod_xsendfile) / lighttpd send it: X-Sendfile with
+                the absolute path
+
+With MEDIA_REQUIRE_AUTH a file is served for a valid signed URL, as
+returned in API responses (glamth.storage: expiring, per file), or to a
+staff user (admin session or ``Authorization: Bearer``).
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .storage import is_content_addressed, media_signature_valid
+from .utils import streaming_body
+
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+UNSATISFIABLE = object()
+
+
+def media_user(request):
+    user = getattr(request, "user", None)   # admin session
+    if user is not None and user.is_authenticated:
+        return user
+
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def can_access(user):
+    # everyone else goes through the signed URL of an object they could see
+    return user.is_active and user.is_staff
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to send the
+    whole file (no / malformed / multi-range header), or UNSATISFIABLE.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return UNSATISFIABLE
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(BLOCK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def cache_control(name):
+    if is_content_addressed(name):
+        return f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    return "private, no-cache"
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    return not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), mtime)
+
+
+def serve_file(request, name, fullpath, content_type):
+    stat = os.stat(fullpath)
+    size = stat.st_size
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = http_date(stat.st_mtime)
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control(name)
+        return response
+
+    byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if byte_range is not None and if_range and if_range not in (etag, last_modified):
+        byte_range = None   # file changed since the client's partial copy
+
+    if byte_range is UNSATISFIABLE:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    body = streaming_body(request, read_range(fullpath, start, length), thread_sensitive=False)
+
+    response = StreamingHttpResponse(body, status=206 if byte_range else 200, content_type=content_type)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Cache-Control"] = cache_control(name)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+
+    if settings.MEDIA_REQUIRE_AUTH and not media_signature_valid(name, request.GET):
+        user = media_user(request)
+        if user is None:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        if not can_access(user):
+            return JsonResponse({"error": "Not allowed"}, status=403)
+
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found")
+
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    mode = settings.MEDIA_SERVE_MODE
+
+    if mode == "x-accel":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + name)
+        response["Cache-Control"] = cache_control(name)
+        return response
+
+    if mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = quote(fullpath)   # mod_xsendfile unescapes it
+        response["Cache-Control"] = cache_control(name)
+        return response
+
+    return serve_file(request, name, fullpath, content_type)
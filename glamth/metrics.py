@@ -0,0 +1,218 @@
+"""
+Prometheus metrics, scraped from /metrics.
+
+  glathread_http_request_seconds          latency per view / method / status class
+  glathread_http_request_db_queries       SQL statements per request
+  glathread_http_request_db_seconds       time spent in those statements
+  glathread_http_response_bytes           response body size
+  glathread_celery_task_seconds           Celery task run time per task / state
+  glathread_websocket_connects_total      accepted sockets per consumer
+  glathread_websocket_frames_sent_total   frames written to sockets per consumer
+
+Requests are labelled with the resolved URL name (``dashboard-counts``,
+``approval-list``, ...), never the raw path, so label sets stay bounded;
+anything that did not resolve is "<unresolved>". Latency and query counts
+cover the view up to the response being returned; a streamed body (exports,
+media) adds its bytes once it has been sent.
+
+/metrics is only served to a scraper that sends METRICS_TOKEN as a bearer
+token or connects from METRICS_ALLOWED_IPS; with neither configured it
+answers 403, since endpoint names and traffic are not public.
+
+prometheus_client is optional: without it the middleware removes itself,
+the hooks do nothing and /metrics answers 404. Under several worker
+processes (gunicorn / daphne workers, Celery prefork) set
+PROMETHEUS_MULTIPROC_DIR to a directory shared by all of them on the host,
+and /metrics reports the sum.
+"""
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram
+    from prometheus_client.multiprocess import MultiProcessCollector
+except ImportError:  # optional, metrics are not collected
+    prometheus_client = None
+
+from celery.signals import task_postrun, task_prerun
+
+
+UNRESOLVED = "<unresolved>"
+
+if prometheus_client is not None:
+    REQUEST_SECONDS = Histogram(
+        "glathread_http_request_seconds", "Request latency",
+        ["view", "method", "status"],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    REQUEST_DB_QUERIES = Histogram(
+        "glathread_http_request_db_queries", "SQL statements per request",
+        ["view", "method"],
+        buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+    REQUEST_DB_SECONDS = Histogram(
+        "glathread_http_request_db_seconds", "Time in SQL per request",
+        ["view", "method"],
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10),
+    )
+    RESPONSE_BYTES = Histogram(
+        "glathread_http_response_bytes", "Response body size",
+        ["view", "method"],
+        buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+    )
+    TASK_SECONDS = Histogram(
+        "glathread_celery_task_seconds", "Celery task run time",
+        ["task", "state"],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+    )
+    WS_CONNECTS = Counter(
+        "glathread_websocket_connects", "Accepted websocket connections", ["consumer"],
+    )
+    WS_FRAMES_SENT = Counter(
+        "glathread_websocket_frames_sent", "Frames sent to websocket clients", ["consumer"],
+    )
+
+
+# =====================================================
+# ✅ HTTP
+# =====================================================
+
+class QueryTimer:
+    """connection.execute_wrapper counting statements and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED
+
+
+def counted(content, observe):
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        observe(size)
+
+
+async def acounted(content, observe):
+    size = 0
+    try:
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        observe(size)
+
+
+class MetricsMiddleware:
+    """Goes first in MIDDLEWARE so the latency includes the other middleware."""
+
+    def __init__(self, get_response):
+        if prometheus_client is None or not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view, method = view_label(request), request.method
+        REQUEST_SECONDS.labels(view, method, f"{response.status_code // 100}xx").observe(elapsed)
+        REQUEST_DB_QUERIES.labels(view, method).observe(timer.count)
+        REQUEST_DB_SECONDS.labels(view, method).observe(timer.seconds)
+
+        observe = RESPONSE_BYTES.labels(view, method).observe
+        if not response.streaming:
+            observe(len(response.content))
+        elif isinstance(response, FileResponse):
+            # keep the wsgi.file_wrapper / sendfile path
+            observe(int(response.get("Content-Length") or 0))
+        elif response.is_async:
+            response.streaming_content = acounted(response.streaming_content, observe)
+        else:
+            response.streaming_content = counted(response.streaming_content, observe)
+        return response
+
+
+def scraper_allowed(request):
+    if settings.METRICS_TOKEN:
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if constant_time_compare(header, f"Bearer {settings.METRICS_TOKEN}"):
+            return True
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if prometheus_client is None or not settings.METRICS_ENABLED:
+        raise Http404
+
+    # ✅ Scraper only: shared secret or allowed address, never open
+    if not scraper_allowed(request):
+        return HttpResponse(status=403)
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(
+        prometheus_client.generate_latest(registry),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
+
+
+# =====================================================
+# ✅ CELERY / WEBSOCKETS
+# =====================================================
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if prometheus_client is None or started is None:
+        return
+    TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+def websocket_connected(consumer):
+    if prometheus_client is not None:
+        WS_CONNECTS.labels(type(consumer).__name__).inc()
+
+
+def websocket_frame_sent(consumer):
+    if prometheus_client is not None:
+        WS_FRAMES_SENT.labels(type(consumer).__name__).inc()
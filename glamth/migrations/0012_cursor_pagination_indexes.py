@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0011_threadmessage_seen_by'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_gate_created_a08ed0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderthread',
+            index=models.Index(fields=['reminder_at', 'id'], name='glamth_remi_reminde_3af016_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestcategory',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_requ_created_c387e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workclaim',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_work_created_5e9207_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workprogressupdate',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_work_created_118423_idx'),
+        ),
+    ]
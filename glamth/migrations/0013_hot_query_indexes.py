@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0012_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['status', 'valid_to'], name='glamth_gate_status_580d69_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderthread',
+            index=models.Index(fields=['created_by', 'reminder_at'], name='glamth_remi_created_76a3ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workclaim',
+            index=models.Index(fields=['payment_status', 'created_at'], name='glamth_work_payment_3d4be7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workprogressupdate',
+            index=models.Index(fields=['thread', 'created_at'], name='glamth_work_thread__8af920_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workthread',
+            index=models.Index(fields=['status', 'approval_status'], name='glamth_work_status_f1d8b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workthread',
+            index=models.Index(fields=['approval_status'], name='glamth_work_approva_08cc00_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workthread',
+            index=models.Index(fields=['created_at'], name='glamth_work_created_fb585d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workthread',
+            index=models.Index(condition=models.Q(('status__in', ('completed', 'payment_completed', 'workcompleted')), _negated=True), fields=['created_at'], name='glamth_thread_open_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='workthread',
+            name='glamth_work_created_fb585d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='workthread',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_work_created_ab1ba9_idx'),
+        ),
+    ]
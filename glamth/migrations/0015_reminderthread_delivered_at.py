@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_past_reminders_delivered(apps, schema_editor):
+    # Reminders already in the past were never sent; don't fire them all
+    # at once the first time the scheduler runs.
+    ReminderThread = apps.get_model('glamth', 'ReminderThread')
+    ReminderThread.objects.filter(
+        reminder_at__lt=timezone.now()
+    ).update(delivered_at=F('reminder_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0014_thread_list_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderthread',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_past_reminders_delivered, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reminderthread',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['reminder_at'], name='glamth_reminder_due_idx'),
+        ),
+    ]
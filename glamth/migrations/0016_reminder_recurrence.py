@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def arm_undelivered_reminders(apps, schema_editor):
+    ReminderThread = apps.get_model('glamth', 'ReminderThread')
+    ReminderThread.objects.filter(
+        delivered_at__isnull=True
+    ).update(next_fire_at=F('reminder_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0015_reminderthread_delivered_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reminderthread',
+            name='glamth_reminder_due_idx',
+        ),
+        migrations.AddField(
+            model_name='reminderthread',
+            name='next_fire_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(arm_undelivered_reminders, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='reminderthread',
+            name='recurrence',
+            field=models.CharField(choices=[('none', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reminderthread',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminderthread',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='reminderthread',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reminderthread',
+            index=models.Index(condition=models.Q(('recurrence', 'none'), _negated=True), fields=['created_by', 'reminder_at'], name='glamth_reminder_series_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderthread',
+            index=models.Index(condition=models.Q(('next_fire_at__isnull', False)), fields=['next_fire_at'], name='glamth_reminder_fire_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact, LessThan, LessThanOrEqual
+
+
+def recalculate_totals(apps, schema_editor):
+    PaymentMaster = apps.get_model('glamth', 'PaymentMaster')
+    PaymentDetail = apps.get_model('glamth', 'PaymentDetail')
+    money = models.DecimalField(max_digits=14, decimal_places=2)
+
+    paid = Coalesce(
+        Subquery(
+            PaymentDetail.objects.filter(
+                payment_master=OuterRef('pk')
+            ).order_by().values('payment_master').annotate(
+                paid=Sum('total')
+            ).values('paid')[:1]
+        ),
+        Value(0, output_field=money),
+        output_field=money,
+    )
+    issue = F('total_issue_amount')
+    PaymentMaster.objects.update(
+        total_paid_amount=paid,
+        balance_amount=issue - paid,
+        overall_status=Case(
+            When(LessThanOrEqual(paid, Value(0, output_field=money)), then=Value('pending')),
+            When(LessThan(paid, issue), then=Value('partial')),
+            When(Exact(paid, issue), then=Value('paid')),
+            default=Value('overpaid'),
+            output_field=models.CharField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0016_reminder_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalculate_totals, migrations.RunPython.noop),
+    ]
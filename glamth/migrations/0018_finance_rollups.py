@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0017_payment_master_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceRollupDirtyMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FinanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('claims', 'Work Claims'), ('issued', 'Payment Issued'), ('paid', 'Payment Transactions')], max_length=10)),
+                ('month', models.DateField()),
+                ('department', models.CharField(blank=True, default='', max_length=255)),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('vendor', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(blank=True, default='', max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'department', 'month'], name='glamth_fina_source_60ec6b_idx'), models.Index(fields=['source', 'vendor', 'month'], name='glamth_fina_source_7d5b86_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'month', 'department', 'category', 'vendor', 'status'), name='finance_rollup_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0018_finance_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approval',
+            index=models.Index(fields=['created_at', 'id'], name='glamth_appr_created_054b15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvalflow',
+            index=models.Index(fields=['approval', 'level'], name='glamth_appr_approva_3be0d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentdetail',
+            index=models.Index(fields=['payment_master', 'sr_no'], name='glamth_paym_payment_3d1e58_idx'),
+        ),
+    ]
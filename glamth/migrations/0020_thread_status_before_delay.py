@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('glamth', '0019_approval_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workthread',
+            name='status_before_delay',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('working', 'Working'), ('workcompleted', 'Work Completed'), ('payment_pending', 'Payment Pending'), ('payment_completed', 'Payment Completed'), ('completed', 'Completed'), ('delayed', 'Delayed'), ('rejected', 'Rejected')], max_length=20, null=True),
+        ),
+    ]
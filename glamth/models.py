@@ -1,6 +1,13 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.db.models.lookups import Exact, LessThan, LessThanOrEqual
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 import random
+from datetime import datetime, timedelta
 from django.utils import timezone
 # ✅ Custom User Manager
 
@@ -79,10 +86,19 @@ class RequestCategory(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+        ]
+
     def __str__(self):
         return self.name
 
 
+# Threads in these states no longer count as open work
+CLOSED_THREAD_STATUSES = ('completed', 'payment_completed', 'workcompleted')
+
+
 class WorkThread(models.Model):
 
     STATUS_CHOICES = (
@@ -169,6 +185,14 @@ class WorkThread(models.Model):
         default='pending'
     )
 
+    # status the nightly sweep moved to 'delayed' from, restored on a new due date
+    status_before_delay = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        blank=True,
+        null=True
+    )
+
     approval_status = models.CharField(
         max_length=20,
         choices=APPROVAL_STATUS_CHOICES,
@@ -189,6 +213,21 @@ class WorkThread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # dashboard status / approval counters
+            models.Index(fields=["status", "approval_status"]),
+            models.Index(fields=["approval_status"]),
+            # today's work (created_at day range) + threads/ keyset pages
+            models.Index(fields=["created_at", "id"]),
+            # overdue scan only ever looks at open threads
+            models.Index(
+                fields=["created_at"],
+                name="glamth_thread_open_created_idx",
+                condition=~Q(status__in=CLOSED_THREAD_STATUSES),
+            ),
+        ]
+
     # ✅ ✅ AUTO-GENERATE GTX + 6 DIGIT UNIQUE NUMBER
     def save(self, *args, **kwargs):
         if not self.thread_number:
@@ -241,6 +280,13 @@ class WorkProgressUpdate(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            # latest expected_end_date per thread
+            models.Index(fields=["thread", "created_at"]),
+        ]
+
     def __str__(self):
         return f"{self.thread.title} | {self.progress_type} | {self.expected_end_date}"
 
@@ -381,6 +427,12 @@ class GatePass(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["status", "valid_to"]),
+        ]
+
     def mark_out(self):
         """Call this when OUT pass is used"""
         self.status = 'out'
@@ -458,6 +510,22 @@ class WorkClaim(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["payment_status", "created_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        mark_rollup_months(self.created_at)
+
+    def delete(self, *args, **kwargs):
+        created_at = self.created_at
+        result = super().delete(*args, **kwargs)
+        mark_rollup_months(created_at)
+        return result
+
     def __str__(self):
         return (
             f"Claim | {self.thread.thread_number} | "
@@ -513,9 +581,68 @@ class ReminderThread(models.Model):
         related_name='created_reminders'
     )
 
+    # 🔁 Recurrence rule (reminder_at is the first occurrence)
+    RECURRENCE_CHOICES = (
+        ('none', 'Does not repeat'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    )
+
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, default='none')
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_until = models.DateTimeField(blank=True, null=True)
+    recurrence_count = models.PositiveIntegerField(blank=True, null=True)
+
+    # 🔔 Scheduler state: next occurrence to push (NULL = nothing pending)
+    next_fire_at = models.DateTimeField(blank=True, null=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["reminder_at", "id"]),
+            # per-user day / agenda ranges (one-shot reminders)
+            models.Index(fields=["created_by", "reminder_at"]),
+            # per-user recurring series, expanded lazily per window
+            models.Index(
+                fields=["created_by", "reminder_at"],
+                name="glamth_reminder_series_idx",
+                condition=~Q(recurrence='none'),
+            ),
+            # scheduler: pending occurrences by fire time
+            models.Index(
+                fields=["next_fire_at"],
+                name="glamth_reminder_fire_idx",
+                condition=Q(next_fire_at__isnull=False),
+            ),
+        ]
+
+    @property
+    def is_recurring(self):
+        return self.recurrence != 'none'
+
+    def reschedule(self, after=None):
+        """
+        One-shot: fire at reminder_at. Series: fire at the first occurrence
+        at or after ``after`` (default: now), or NULL once the series ended.
+        """
+        from .recurrence import next_occurrence
+
+        if not self.is_recurring:
+            self.next_fire_at = self.reminder_at
+            return
+
+        after = after or timezone.now()
+        self.next_fire_at = next_occurrence(self, after - timedelta(microseconds=1))
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.next_fire_at is None and self.delivered_at is None:
+            self.next_fire_at = self.reminder_at
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Reminder for {self.work_thread.thread_number} at {self.reminder_at}"
 
@@ -557,6 +684,28 @@ class Approval(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+        ]
+
+    # ✅ department / vendor feed the finance rollups of every payment month
+    def payment_months(self):
+        return [
+            *PaymentMaster.objects.filter(approval=self).values_list('created_at', flat=True),
+            *PaymentDetail.objects.filter(payment_master__approval=self).values_list('transaction_date', flat=True),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        mark_rollup_months(*self.payment_months())
+
+    def delete(self, *args, **kwargs):
+        months = self.payment_months()
+        result = super().delete(*args, **kwargs)
+        mark_rollup_months(*months)
+        return result
+
     def __str__(self):
         return f"Approval {self.approval_no} | Thread {self.work_thread.thread_number}"
 
@@ -588,6 +737,12 @@ class ApprovalFlow(models.Model):
 
     remarks = models.TextField(blank=True, null=True)  # optional improvement
 
+    class Meta:
+        indexes = [
+            # ledger: flow levels of an approval, in order
+            models.Index(fields=["approval", "level"]),
+        ]
+
     def __str__(self):
         return f"{self.role} - {self.name} (Level {self.level})"
 
@@ -596,6 +751,40 @@ class ApprovalFlow(models.Model):
 #  PAYMENT MASTER (SUMMARY)
 # ============================================================
 
+# Amount columns hold 2 decimals; arithmetic on them keeps that type
+MONEY = models.DecimalField(max_digits=14, decimal_places=2)
+
+# Columns written only from PaymentDetail changes / reconciliation
+PAYMENT_DERIVED_FIELDS = {'total_paid_amount', 'balance_amount', 'overall_status'}
+
+
+def money(expression):
+    """Round to the columns' 2 decimals; SQLite does this arithmetic in REAL."""
+    return Round(expression, 2, output_field=MONEY)
+
+
+def payment_status(paid, issue):
+    """overall_status from the amounts (Python twin of payment_status_case)."""
+    if paid <= 0:
+        return 'pending'
+    if paid < issue:
+        return 'partial'
+    if paid == issue:
+        return 'paid'
+    return 'overpaid'
+
+
+def payment_status_case(paid, issue):
+    paid, issue = money(paid), money(issue)
+    return Case(
+        When(LessThanOrEqual(paid, Value(0, output_field=MONEY)), then=Value('pending')),
+        When(LessThan(paid, issue), then=Value('partial')),
+        When(Exact(paid, issue), then=Value('paid')),
+        default=Value('overpaid'),
+        output_field=models.CharField(),
+    )
+
+
 class PaymentMaster(models.Model):
     approval = models.ForeignKey(
         Approval,
@@ -613,14 +802,154 @@ class PaymentMaster(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # recommended
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.balance_amount = Decimal(self.total_issue_amount) - Decimal(self.total_paid_amount)
+            self.overall_status = payment_status(Decimal(self.total_paid_amount), Decimal(self.total_issue_amount))
+            super().save(*args, **kwargs)
+            mark_rollup_months(self.created_at)
+            return
+
+        # ✅ Never write back a stale total_paid_amount; balance / status are
+        # recomputed from the stored columns after the save
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+        kwargs['update_fields'] = [f for f in update_fields if f not in PAYMENT_DERIVED_FIELDS]
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            PaymentMaster.objects.filter(pk=self.pk).update(
+                balance_amount=money(F('total_issue_amount') - F('total_paid_amount')),
+                overall_status=payment_status_case(F('total_paid_amount'), F('total_issue_amount')),
+            )
+        self.refresh_from_db(fields=list(PAYMENT_DERIVED_FIELDS))
+        mark_rollup_months(self.created_at)
+
+    def delete(self, *args, **kwargs):
+        months = [self.created_at, *self.payment_details.values_list('transaction_date', flat=True)]
+        result = super().delete(*args, **kwargs)
+        mark_rollup_months(*months)
+        return result
+
     def __str__(self):
         return f"Payment Master for Approval {self.approval.approval_no}"
 
 
+def apply_payment_deltas(deltas, batch_size=100):
+    """
+    {payment_master_id: change in sum(PaymentDetail.total)} -> atomic UPDATEs
+    with F() expressions (a CASE per batch of masters), so concurrent
+    writers never lose each other's amounts.
+    """
+    deltas = [(master_id, delta) for master_id, delta in deltas.items() if delta]
+    for start in range(0, len(deltas), batch_size):
+        batch = dict(deltas[start:start + batch_size])
+        if len(batch) == 1:
+            delta = Value(next(iter(batch.values())), output_field=MONEY)
+        else:
+            delta = Case(
+                *(When(pk=master_id, then=Value(value, output_field=MONEY)) for master_id, value in batch.items()),
+                output_field=MONEY,
+            )
+        masters = PaymentMaster.objects.filter(pk__in=batch)
+        with transaction.atomic(savepoint=False):
+            masters.update(total_paid_amount=money(F('total_paid_amount') + delta), updated_at=timezone.now())
+            # row locks from the first UPDATE are held until commit
+            masters.update(
+                balance_amount=money(F('total_issue_amount') - F('total_paid_amount')),
+                overall_status=payment_status_case(F('total_paid_amount'), F('total_issue_amount')),
+            )
+
+
+def actual_paid_subquery():
+    return money(Coalesce(
+        Subquery(
+            PaymentDetail.objects.filter(
+                payment_master=OuterRef('pk')
+            ).order_by().values('payment_master').annotate(
+                paid=Sum('total')
+            ).values('paid')[:1]
+        ),
+        Value(0, output_field=MONEY),
+        output_field=MONEY,
+    ))
+
+
+def payment_drift(queryset=None):
+    """Masters whose stored totals / status disagree with their detail rows."""
+    queryset = PaymentMaster.objects.all() if queryset is None else queryset
+    return queryset.annotate(actual_paid=actual_paid_subquery()).exclude(
+        total_paid_amount=F('actual_paid'),
+        balance_amount=money(F('total_issue_amount') - F('actual_paid')),
+        overall_status=payment_status_case(F('actual_paid'), F('total_issue_amount')),
+    )
+
+
+def recalculate_payment_totals(master_ids=None):
+    """Re-aggregate from PaymentDetail in one set-based UPDATE. Returns rows fixed."""
+    drifted = payment_drift(
+        None if master_ids is None else PaymentMaster.objects.filter(pk__in=master_ids)
+    )
+    paid = actual_paid_subquery()
+    return PaymentMaster.objects.filter(pk__in=drifted.values('pk')).update(
+        total_paid_amount=paid,
+        balance_amount=money(F('total_issue_amount') - paid),
+        overall_status=payment_status_case(paid, F('total_issue_amount')),
+        updated_at=timezone.now(),
+    )
+
+
 # ============================================================
 #  PAYMENT DETAIL (MULTIPLE TRANSACTIONS)
 # ============================================================
 
+class PaymentDetailQuerySet(models.QuerySet):
+    """Bulk writes keep PaymentMaster totals current too."""
+
+    def master_totals(self, sign=1):
+        return {
+            row['payment_master_id']: sign * row['paid']
+            for row in self.order_by().values('payment_master_id').annotate(paid=Sum('total'))
+        }
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            deltas = defaultdict(Decimal)
+            for obj in objs:
+                deltas[obj.payment_master_id] += Decimal(obj.total)
+            apply_payment_deltas(deltas)
+        mark_rollup_months(*(obj.transaction_date for obj in objs))
+        return objs
+
+    def update(self, **kwargs):
+        changed = set(kwargs)
+        if not {'total', 'payment_master', 'payment_master_id', 'transaction_date'} & changed:
+            return super().update(**kwargs)
+        with transaction.atomic():
+            before = list(self.values_list('pk', 'payment_master_id', 'transaction_date'))
+            count = super().update(**kwargs)
+            after = list(
+                PaymentDetail.objects.filter(
+                    pk__in=[pk for pk, _, _ in before]
+                ).values_list('pk', 'payment_master_id', 'transaction_date')
+            )
+            if {'total', 'payment_master', 'payment_master_id'} & changed:
+                recalculate_payment_totals({master_id for _, master_id, _ in before + after})
+        mark_rollup_months(*(day for _, _, day in before + after))
+        return count
+
+    def delete(self):
+        with transaction.atomic():
+            deltas = self.master_totals(sign=-1)
+            months = set(self.values_list('transaction_date', flat=True))
+            result = super().delete()
+            apply_payment_deltas(deltas)
+        mark_rollup_months(*months)
+        return result
+
+
 class PaymentDetail(models.Model):
     payment_master = models.ForeignKey(
         PaymentMaster,
@@ -643,7 +972,126 @@ class PaymentDetail(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PaymentDetailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # ledger: transactions of a payment master, in order
+            models.Index(fields=["payment_master", "sr_no"]),
+        ]
+
+    # ✅ Every insert / update / delete moves the master's totals by the difference
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'total', 'payment_master', 'transaction_date'} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = PaymentDetail.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('payment_master_id', 'total', 'transaction_date').first()
+
+            super().save(*args, **kwargs)
+
+            deltas = defaultdict(Decimal)
+            if previous:
+                deltas[previous[0]] -= previous[1]
+            deltas[self.payment_master_id] += Decimal(self.total)
+            apply_payment_deltas(deltas)
+        mark_rollup_months(self.transaction_date, previous and previous[2])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = PaymentDetail.objects.select_for_update().filter(
+                pk=self.pk
+            ).values_list('payment_master_id', 'total', 'transaction_date').first()
+            result = super().delete(*args, **kwargs)
+            if previous:
+                apply_payment_deltas({previous[0]: -previous[1]})
+        mark_rollup_months(previous and previous[2])
+        return result
+
     def __str__(self):
         return f"Payment {self.transaction_no} - {self.total}"
-    
-    
\ No newline at end of file
+
+
+# ============================================================
+#  FINANCE ROLLUPS (glamth.rollups)
+# ============================================================
+
+def month_start(value):
+    """First day of the local calendar month of a date / datetime."""
+    if isinstance(value, datetime):
+        value = timezone.localdate(value)
+    return value.replace(day=1)
+
+
+class FinanceRollup(models.Model):
+    """
+    Spend per source / month / department / category / vendor / status,
+    rebuilt per month by glamth.rollups. Missing dimensions are ''.
+    """
+    SOURCE_CHOICES = (
+        ('claims', 'Work Claims'),
+        ('issued', 'Payment Issued'),
+        ('paid', 'Payment Transactions'),
+    )
+
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    month = models.DateField()
+    department = models.CharField(max_length=255, blank=True, default='')
+    category = models.CharField(max_length=100, blank=True, default='')
+    vendor = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=50, blank=True, default='')
+
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "month", "department", "category", "vendor", "status"],
+                name="finance_rollup_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["source", "department", "month"]),
+            models.Index(fields=["source", "vendor", "month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source} | {self.month:%Y-%m} | {self.department or '-'} | {self.amount}"
+
+
+class FinanceRollupDirtyMonth(models.Model):
+    """Months whose source rows changed since their rollups were last rebuilt."""
+    month = models.DateField(unique=True)
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} (marked {self.marked_at})"
+
+
+def mark_rollup_months(*values):
+    """
+    Queue the months of these dates / datetimes for the next rollup refresh.
+    Written after commit, so a refresh that starts later sees the change.
+    """
+    months = {month_start(value) for value in values if value}
+    if not months:
+        return
+
+    def mark():
+        now = timezone.now()
+        FinanceRollupDirtyMonth.objects.bulk_create(
+            [FinanceRollupDirtyMonth(month=month, marked_at=now) for month in months],
+            update_conflicts=True,
+            unique_fields=['month'],
+            update_fields=['marked_at'],
+        )
+
+    transaction.on_commit(mark)
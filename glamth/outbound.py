@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from collections import deque
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Process-wide counters for every connection's outbound queue.
+OUTBOUND_STATS = {
+    "sent": 0,
+    "coalesced": 0,
+    "dropped": 0,
+    "closed": 0,
+}
+
+
+class OutboundQueue:
+    """
+    Per-connection outbound frame queue.
+
+    Keyless frames (chat) are sent in order as soon as possible. A keyed
+    frame is also sent straight away when the queue is idle; only under
+    load (frames waiting or a send in progress) or when the same key went
+    out less than the coalesce window ago is it held for the window, and
+    identical keys arriving meanwhile are merged into the frame already
+    waiting. Once ``max_frames`` are waiting the queue reports overflow so
+    the consumer can drop the frame or close a client that cannot keep up.
+
+    If ``send`` raises, the error is logged, the queue stops accepting
+    frames and ``on_error`` (a coroutine function) is awaited so the
+    consumer can close the socket.
+    """
+
+    def __init__(self, send, window=None, max_frames=None, on_error=None):
+        self.send = send
+        self.on_error = on_error
+        self.window = settings.WS_COALESCE_WINDOW if window is None else window
+        self.max_frames = settings.WS_MAX_QUEUED_FRAMES if max_frames is None else max_frames
+
+        self.ready = deque()
+        self.held = {}
+        self.recent = {}      # key -> handle expiring it, for keys sent inside the window
+        self.sending = False
+        self.closed = False
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def __len__(self):
+        return len(self.ready) + len(self.held)
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._run())
+        self.task.add_done_callback(self._sender_done)
+
+    def stop(self):
+        self._discard()
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def _discard(self):
+        self.closed = True
+        for handle in (*self.held.values(), *self.recent.values()):
+            handle.cancel()
+        self.held.clear()
+        self.recent.clear()
+        self.ready.clear()
+
+    def put(self, frame, key=None):
+        """
+        Queue a frame. Returns False when the queue is full or stopped and
+        the frame was dropped.
+        """
+        if self.closed:
+            return False
+
+        if key is not None and key in self.held:
+            OUTBOUND_STATS["coalesced"] += 1
+            return True
+
+        if len(self) >= self.max_frames:
+            OUTBOUND_STATS["dropped"] += 1
+            return False
+
+        if key is None or self.window <= 0:
+            self._release(frame)
+        elif self.ready or self.sending or key in self.recent:
+            loop = asyncio.get_running_loop()
+            self.held[key] = loop.call_later(self.window, self._flush_held, key, frame)
+        else:
+            self._release_keyed(key, frame)
+        return True
+
+    def _flush_held(self, key, frame):
+        self.held.pop(key, None)
+        self._release_keyed(key, frame)
+
+    def _release_keyed(self, key, frame):
+        # a repeat of this key inside the window waits and is merged
+        previous = self.recent.pop(key, None)
+        if previous:
+            previous.cancel()
+        loop = asyncio.get_running_loop()
+        self.recent[key] = loop.call_later(self.window, self.recent.pop, key, None)
+        self._release(frame)
+
+    def _release(self, frame):
+        self.ready.append(frame)
+        self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.ready:
+                # send() waits on the transport, so a slow client backs up
+                # here instead of in an unbounded server-side buffer.
+                self.sending = True
+                try:
+                    await self.send(self.ready.popleft())
+                finally:
+                    self.sending = False
+                OUTBOUND_STATS["sent"] += 1
+
+    def _sender_done(self, task):
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Outbound sender failed, closing the connection", exc_info=task.exception())
+        self._discard()
+        self.task = None
+        if self.on_error:
+            asyncio.ensure_future(self.on_error())
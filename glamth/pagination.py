@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Default pagination for every ModelViewSet.
+
+    Views choose their order with ``cursor_ordering``; it should start with
+    an indexed column and end with the primary key so pages are stable.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,36 @@
+from rest_framework.permissions import BasePermission
+
+
+# User.role values that may see the finance ledger (CFO)
+FINANCE_ROLES = (1,)
+
+# User.role values that may approve / reject work threads (CFO, Registrar)
+APPROVER_ROLES = (1, 2)
+
+
+def is_finance_user(user):
+    return bool(
+        user and user.is_authenticated and user.is_active
+        and (user.is_staff or user.role in FINANCE_ROLES)
+    )
+
+
+class IsFinanceUser(BasePermission):
+    """Staff, or a user whose role may see payments, rollups and approvals."""
+
+    def has_permission(self, request, view):
+        return is_finance_user(request.user)
+
+
+def is_thread_approver(user):
+    return bool(
+        user and user.is_authenticated and user.is_active
+        and (user.is_staff or user.role in APPROVER_ROLES)
+    )
+
+
+class IsThreadApprover(BasePermission):
+    """Staff, or a user whose role may decide work threads, one or in bulk."""
+
+    def has_permission(self, request, view):
+        return is_thread_approver(request.user)
@@ -13,12 +13,40 @@ def notify_dashboard(user_ids):
         )
 
 
+def send_dashboard_events(events_by_user):
+    """
+    One dashboard_update per user carrying that user's payload,
+    e.g. {uid: {"action": "reminders", "reminders": [...]}}.
+    """
+    channel_layer = get_channel_layer()
+    for uid, data in events_by_user.items():
+        async_to_sync(channel_layer.group_send)(
+            f"dashboard_{uid}",
+            {
+                "type": "dashboard_update",
+                "data": data
+            }
+        )
+
+
 def notify_chat(thread_id, payload):
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         f"chat_{thread_id}",
         {
             "type": "chat_message",
+            "thread_id": thread_id,
             "message": payload
         }
-    )
\ No newline at end of file
+    )
+
+def notify_vehicles_out(data):
+    """Change on the live vehicles-out board (ws/stream/ topic "vehicles_out")."""
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        "vehicles_out",
+        {
+            "type": "vehicles_out_update",
+            "data": data
+        }
+    )
@@ -0,0 +1,109 @@
+"""
+Lazy expansion of recurring ReminderThread series.
+
+A series is stored once: ``reminder_at`` is the first occurrence and the
+rule is ``recurrence`` / ``recurrence_interval`` bounded by
+``recurrence_until`` and/or ``recurrence_count``. Occurrences are computed
+only for the window being read or scheduled; the first index inside the
+window is found arithmetically, so cost depends on the window, not on how
+long the series has been running.
+"""
+import calendar
+import copy
+from datetime import timedelta
+
+from django.db.models import Q
+
+
+def add_months(value, months):
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def occurrence_at(reminder, index):
+    """The index-th occurrence (0 = reminder_at), ignoring until/count."""
+    step = reminder.recurrence_interval or 1
+    if reminder.recurrence == 'daily':
+        return reminder.reminder_at + timedelta(days=step * index)
+    if reminder.recurrence == 'weekly':
+        return reminder.reminder_at + timedelta(weeks=step * index)
+    if reminder.recurrence == 'monthly':
+        return add_months(reminder.reminder_at, step * index)
+    return reminder.reminder_at if index == 0 else None
+
+
+def first_index_from(reminder, start):
+    """Smallest index whose occurrence is >= start."""
+    anchor = reminder.reminder_at
+    if start <= anchor or reminder.recurrence == 'none':
+        return 0
+
+    step = reminder.recurrence_interval or 1
+    if reminder.recurrence in ('daily', 'weekly'):
+        period = timedelta(days=step) if reminder.recurrence == 'daily' else timedelta(weeks=step)
+        return -((anchor - start) // period)   # ceil division
+
+    # monthly: jump close, then settle (month lengths vary)
+    months = (start.year - anchor.year) * 12 + (start.month - anchor.month)
+    index = max(0, months // step - 1)
+    while occurrence_at(reminder, index) < start:
+        index += 1
+    return index
+
+
+def iter_occurrences(reminder, start, end):
+    """Occurrences in [start, end)."""
+    index = first_index_from(reminder, start)
+    while True:
+        if reminder.recurrence_count is not None and index >= reminder.recurrence_count:
+            return
+        occurrence = occurrence_at(reminder, index)
+        if occurrence is None or occurrence >= end:
+            return
+        if reminder.recurrence_until is not None and occurrence > reminder.recurrence_until:
+            return
+        yield occurrence
+        index += 1
+
+
+def next_occurrence(reminder, after):
+    """First occurrence strictly after ``after``, or None when the series has ended."""
+    index = first_index_from(reminder, after)
+    while True:
+        if reminder.recurrence_count is not None and index >= reminder.recurrence_count:
+            return None
+        occurrence = occurrence_at(reminder, index)
+        if occurrence is None:
+            return None
+        if reminder.recurrence_until is not None and occurrence > reminder.recurrence_until:
+            return None
+        if occurrence > after:
+            return occurrence
+        index += 1
+
+
+def series_overlapping(queryset, start, end):
+    """Recurring series from ``queryset`` that may have occurrences in [start, end)."""
+    return queryset.exclude(recurrence='none').filter(
+        reminder_at__lt=end
+    ).filter(
+        Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start)
+    )
+
+
+def expand_reminders(series, start, end):
+    """
+    One shallow copy per occurrence in [start, end), with ``reminder_at``
+    set to the occurrence, so existing serializers can render them.
+    """
+    expanded = []
+    for reminder in series:
+        for occurrence in iter_occurrences(reminder, start, end):
+            item = copy.copy(reminder)
+            item.reminder_at = occurrence
+            expanded.append(item)
+    expanded.sort(key=lambda item: (item.reminder_at, item.id))
+    return expanded
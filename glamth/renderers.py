@@ -0,0 +1,37 @@
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib renderer
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Output matches DRF's compact JSON: datetimes and anything orjson does
+    not know natively go through DRF's own encoder, and U+2028/U+2029 are
+    escaped the same way. Indented (browsable / ?indent) responses and
+    payloads orjson rejects are handed to the stdlib renderer.
+    """
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+    encoder_default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,171 @@
+"""
+Finance rollups: spend per month / department / category / vendor.
+
+FinanceRollup holds one row per (source, month, dimensions) with the
+summed amount and row count, so reports read a few hundred rows instead
+of scanning every claim and payment. Sources:
+
+  claims   WorkClaim.claim_amount by created_at month
+  issued   PaymentMaster.total_issue_amount by created_at month
+  paid     PaymentDetail.total by transaction_date month
+
+Saves and deletes of those rows (and of Approval, whose department /
+vendor they report under) queue their month in FinanceRollupDirtyMonth.
+refresh_dirty_rollups() re-aggregates only those months; beat runs it
+every FINANCE_ROLLUP_REFRESH_SECONDS. Changes that don't touch the rows
+themselves (a thread's category, a user's department, raw SQL) are picked
+up by the nightly rebuild_rollups().
+"""
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    FinanceRollup, FinanceRollupDirtyMonth, PaymentDetail, PaymentMaster, WorkClaim,
+    month_start,
+)
+from .recurrence import add_months
+
+
+# =====================================================
+# ✅ SOURCES: name -> (queryset, month field, is DateField, amount, dimension lookups)
+# =====================================================
+
+ROLLUP_SOURCES = {
+    "claims": (
+        lambda: WorkClaim.objects.filter(claim_amount__isnull=False),
+        "created_at", False, "claim_amount",
+        {
+            "department": "thread__created_by__department",
+            "category": "thread__request_category__name",
+            "vendor": None,
+            "status": "payment_status",
+        },
+    ),
+    "issued": (
+        lambda: PaymentMaster.objects.all(),
+        "created_at", False, "total_issue_amount",
+        {
+            "department": "approval__department",
+            "category": "approval__work_thread__request_category__name",
+            "vendor": "approval__vendor_name",
+            "status": None,
+        },
+    ),
+    "paid": (
+        lambda: PaymentDetail.objects.all(),
+        "transaction_date", True, "total",
+        {
+            "department": "payment_master__approval__department",
+            "category": "payment_master__approval__work_thread__request_category__name",
+            "vendor": "payment_master__approval__vendor_name",
+            "status": None,
+        },
+    ),
+}
+
+DIMENSIONS = ("department", "category", "vendor", "status")
+
+
+def month_bounds(month, is_date):
+    """[start, end) of a month, as dates or local-time datetimes."""
+    end = add_months(month, 1)
+    if is_date:
+        return month, end
+    return (
+        timezone.make_aware(datetime.combine(month, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def aggregate(source, month=None):
+    """FinanceRollup rows (unsaved) for one source, one month or all of them."""
+    queryset, field, is_date, amount, lookups = ROLLUP_SOURCES[source]
+    queryset = queryset()
+    if month is not None:
+        start, end = month_bounds(month, is_date)
+        queryset = queryset.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+
+    dimensions = {
+        name: Coalesce(F(lookup), Value("")) if lookup else Value("")
+        for name, lookup in lookups.items()
+    }
+    rows = queryset.order_by().values(
+        rollup_month=TruncMonth(field), **dimensions
+    ).annotate(total=Sum(amount), rows=Count("pk"))
+
+    return [
+        FinanceRollup(
+            source=source,
+            month=month_start(row["rollup_month"]),
+            amount=row["total"] or 0,
+            count=row["rows"],
+            **{name: row[name] for name in DIMENSIONS},
+        )
+        for row in rows
+    ]
+
+
+# =====================================================
+# ✅ REFRESH / REBUILD
+# =====================================================
+
+def refresh_months(months):
+    """Replace the rollups of these months from the source tables."""
+    months = sorted({month_start(month) for month in months})
+    with transaction.atomic():
+        FinanceRollup.objects.filter(month__in=months).delete()
+        FinanceRollup.objects.bulk_create(
+            [row for month in months for source in ROLLUP_SOURCES for row in aggregate(source, month)],
+            batch_size=1000,
+        )
+    return months
+
+
+def refresh_dirty_rollups():
+    """Re-aggregate queued months. Marks made while this runs stay queued."""
+    started = timezone.now()
+    months = list(FinanceRollupDirtyMonth.objects.values_list("month", flat=True))
+    if not months:
+        return []
+    refresh_months(months)
+    FinanceRollupDirtyMonth.objects.filter(month__in=months, marked_at__lte=started).delete()
+    return months
+
+
+def rebuild_rollups():
+    """Recompute every month in one aggregate query per source. Returns the row count."""
+    started = timezone.now()
+    rows = [row for source in ROLLUP_SOURCES for row in aggregate(source)]
+    with transaction.atomic():
+        FinanceRollup.objects.all().delete()
+        FinanceRollup.objects.bulk_create(rows, batch_size=1000)
+    FinanceRollupDirtyMonth.objects.filter(marked_at__lte=started).delete()
+    return len(rows)
+
+
+# =====================================================
+# ✅ REPORT
+# =====================================================
+
+def rollup_report(source, group_by, start=None, end=None, filters=None):
+    """
+    Totals from the rollup table grouped by ``group_by`` (any of "month" and
+    DIMENSIONS), for months in [start, end] and exact dimension filters.
+    """
+    queryset = FinanceRollup.objects.filter(source=source, **(filters or {}))
+    if start:
+        queryset = queryset.filter(month__gte=month_start(start))
+    if end:
+        queryset = queryset.filter(month__lte=month_start(end))
+
+    rows = queryset.values(*group_by).annotate(
+        amount=Sum("amount"), count=Sum("count")
+    ).order_by(*group_by)
+    return [
+        {**row, "month": row["month"].strftime("%Y-%m")} if "month" in row else row
+        for row in rows
+    ]
@@ -1,5 +1,5 @@
 from django.urls import re_path
-from .consumers import ChatConsumer
+from .consumers import ChatConsumer, StreamConsumer
 
 # websocket_urlpatterns = [
 #     re_path(r'ws/chat/(?P<thread_id>\w+)/$', ChatConsumer.as_asgi()),
@@ -8,4 +8,5 @@ from .consumers import ChatConsumer
 websocket_urlpatterns = [
     re_path(r'ws/chat/(?P<thread_id>\d+)/$', ChatConsumer.as_asgi()),
     re_path(r'ws/dashboard/$', ChatConsumer.as_asgi()),
+    re_path(r'ws/stream/$', StreamConsumer.as_asgi()),
 ]
\ No newline at end of file
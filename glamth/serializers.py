@@ -1,7 +1,13 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
 from rest_framework import serializers
-from django.contrib.auth import authenticate
+from .backends import pooled_authenticate
+from .fast_serializers import serialize_thread_messages, thread_messages
+from .gatepass import DIRECTIONS, make_gate_token, revoke_gate_tokens
 from .models import User
 from .models import *
+from django.conf import settings
 from django.utils import timezone
 
 class LoginSerializer(serializers.Serializer):
@@ -12,7 +18,10 @@ class LoginSerializer(serializers.Serializer):
         email = data.get('email')
         password = data.get('password')
 
-        user = authenticate(email=email, password=password)
+        # PBKDF2 runs on the bounded hashing pool
+        user = pooled_authenticate(
+            self.context.get('request'), email=email, password=password
+        )
 
         if not user:
             raise serializers.ValidationError("Invalid email or password")
@@ -245,6 +254,33 @@ class WorkProgressUpdateSerializer(serializers.ModelSerializer):
 
 
 
+class WorkThreadListSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+    request_category_name = serializers.CharField(
+        source='request_category.name',
+        read_only=True,
+        default=None
+    )
+
+    class Meta:
+        model = WorkThread
+        fields = [
+            'id',
+            'thread_number',
+            'title',
+            'request_category',
+            'request_category_name',
+            'vehicle_number',
+            'vehicle_type',
+            'status',
+            'approval_status',
+            'created_by',
+            'created_by_name',
+            'created_at',
+            'updated_at',
+        ]
+
+
 class WorkThreadCreateSerializer(serializers.ModelSerializer):
 
     assigned_to = serializers.PrimaryKeyRelatedField(
@@ -346,6 +382,19 @@ class WorkThreadApprovalSerializer(serializers.ModelSerializer):
         return instance
 
 
+class WorkThreadBulkApprovalSerializer(serializers.Serializer):
+    thread_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_APPROVAL_MAX
+    )
+    approval_status = serializers.ChoiceField(choices=['approved', 'rejected'])
+    approval_remark = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_thread_ids(self, value):
+        return list(dict.fromkeys(value))   # de-duplicate, keep order
+
+
 
 class WorkProgressUpdateSerializer(serializers.ModelSerializer):
     updated_by_name = serializers.CharField(source='updated_by.full_name', read_only=True)
@@ -433,6 +482,8 @@ class LoggedInUserSerializer(serializers.ModelSerializer):
 
 
 class GatePassSerializer(serializers.ModelSerializer):
+    # ✅ signed token for the gate kiosk QR code (approved / OUT passes only)
+    kiosk_token = serializers.SerializerMethodField()
 
     class Meta:
         model = GatePass
@@ -449,6 +500,7 @@ class GatePassSerializer(serializers.ModelSerializer):
             'out_time',
             'in_time',
             'created_at',
+            'kiosk_token',
         ]
         read_only_fields = [
             'status',
@@ -458,6 +510,19 @@ class GatePassSerializer(serializers.ModelSerializer):
             'created_at',
         ]
 
+    def get_kiosk_token(self, obj):
+        return make_gate_token(obj)
+
+
+class GateScanSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    direction = serializers.ChoiceField(choices=DIRECTIONS, default='in')
+    scanned_at = serializers.DateTimeField(required=False)   # kiosk clock, for buffered scans
+
+
+class GateBulkMarkInSerializer(serializers.Serializer):
+    scans = GateScanSerializer(many=True, allow_empty=False, max_length=settings.GATE_BULK_SCAN_MAX)
+
 
 # ✅ APPROVE / REJECT SERIALIZER
 class GatePassApprovalSerializer(serializers.ModelSerializer):
@@ -479,6 +544,8 @@ class GatePassApprovalSerializer(serializers.ModelSerializer):
         instance.approved_by = request.user
         instance.approved_at = timezone.now()
         instance.save()
+        if instance.status == 'rejected':
+            revoke_gate_tokens(instance.id)
         return instance
 
 
@@ -554,7 +621,8 @@ class WorkThreadFullDetailSerializer(serializers.ModelSerializer):
 
     assigned_to_details = serializers.SerializerMethodField()
     progress_updates = WorkProgressUpdateSerializer(many=True, read_only=True)
-    messages = ThreadMessageSerializer(many=True, read_only=True)
+    # ⚡ plain-dict projection, chat history is the biggest part of the payload
+    messages = serializers.SerializerMethodField()
 
     # ✅ NEW
     gate_passes = GatePassDetailSerializer(many=True, read_only=True)
@@ -629,6 +697,9 @@ class WorkThreadFullDetailSerializer(serializers.ModelSerializer):
             for user in obj.assigned_to.all()
         ]
 
+    def get_messages(self, obj):
+        return serialize_thread_messages(thread_messages(obj.id))
+
 
 
 
@@ -660,6 +731,8 @@ class ReminderThreadSerializer(serializers.ModelSerializer):
         source='work_thread.thread_number',
         read_only=True
     )
+    # recurrence.py steps by this; 0 would be stored but scheduled as 1
+    recurrence_interval = serializers.IntegerField(min_value=1, max_value=32767, required=False)
 
     class Meta:
         model = ReminderThread
@@ -669,18 +742,242 @@ class ReminderThreadSerializer(serializers.ModelSerializer):
             'work_thread_number',
             'reminder_at',
             'message',
+            'recurrence',
+            'recurrence_interval',
+            'recurrence_until',
+            'recurrence_count',
+            'next_fire_at',
             'created_by',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ('created_by', 'created_at', 'updated_at')
+        read_only_fields = ('next_fire_at', 'created_by', 'created_at', 'updated_at')
+
+    SCHEDULE_FIELDS = (
+        'reminder_at',
+        'recurrence',
+        'recurrence_interval',
+        'recurrence_until',
+        'recurrence_count',
+    )
+
+    def validate(self, data):
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(self.instance, field, None)
+
+        recurrence = current('recurrence') or 'none'
+        if recurrence == 'none' and (current('recurrence_until') or current('recurrence_count')):
+            raise serializers.ValidationError({
+                "recurrence": "Set a recurrence to use recurrence_until / recurrence_count."
+            })
+        until = current('recurrence_until')
+        if until and current('reminder_at') and until < current('reminder_at'):
+            raise serializers.ValidationError({
+                "recurrence_until": "Must be after reminder_at."
+            })
+        return data
 
     # Auto-assign created_by from request.user
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        changed = any(
+            field in validated_data and validated_data[field] != getattr(instance, field)
+            for field in self.SCHEDULE_FIELDS
+        )
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        # Moved / re-ruled reminders must fire again
+        if changed:
+            instance.reschedule()
+
+        instance.save()
+        return instance
     
 
 
+# =====================================================
+# ✅ APPROVAL LEDGER (read only)
+# =====================================================
+
+class ApprovalFlowSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ApprovalFlow
+        fields = ['id', 'level', 'role', 'name', 'department', 'approved_at', 'remarks']
+
+
+class PaymentDetailSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = PaymentDetail
+        fields = [
+            'id',
+            'sr_no',
+            'amount',
+            'tax',
+            'total',
+            'transaction_no',
+            'transaction_date',
+            'transaction_by',
+            'signature',
+            'received_by',
+            'bank_status',
+            'created_at',
+        ]
+
+
+class PaymentMasterLedgerSerializer(serializers.ModelSerializer):
+    payment_details = PaymentDetailSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PaymentMaster
+        fields = [
+            'id',
+            'total_issue_amount',
+            'total_paid_amount',
+            'balance_amount',
+            'overall_status',
+            'remarks',
+            'created_at',
+            'updated_at',
+            'payment_details',
+        ]
+
+
+class ApprovalLedgerSerializer(serializers.ModelSerializer):
+    """Approval + flow levels + payment masters + transactions, from prefetched rows."""
+
+    work_thread_number = serializers.CharField(source='work_thread.thread_number', read_only=True)
+    approval_flow = ApprovalFlowSerializer(many=True, read_only=True)
+    payment_master = PaymentMasterLedgerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Approval
+        fields = [
+            'id',
+            'approval_no',
+            'approval_type',
+            'approval_date',
+            'created_date',
+            'work_thread',
+            'work_thread_number',
+            'purpose',
+            'campus',
+            'department',
+            'vendor_name',
+            'vendor_address',
+            'vendor_contact',
+            'related_person_name',
+            'related_person_designation',
+            'related_person_contact',
+            'description',
+            'amount_in_words',
+            'comments',
+            'item_received_date',
+            'expected_delivery_date',
+            'status',
+            'created_at',
+            'approval_flow',
+            'payment_master',
+        ]
+
+
+# =====================================================
+# ✅ APPROVAL / PAYMENT IMPORT ROWS (glamth.imports)
+# =====================================================
+
+# Day 0 of spreadsheet date serials (1900 date system)
+SPREADSHEET_EPOCH = datetime(1899, 12, 30)
+
+
+class SpreadsheetDateField(serializers.DateField):
+    """ISO date, or the day serial a spreadsheet stores for date cells."""
+
+    def to_internal_value(self, value):
+        try:
+            return (SPREADSHEET_EPOCH + timedelta(days=float(value))).date()
+        except (TypeError, ValueError, OverflowError):
+            return super().to_internal_value(value)
+
+
+class SpreadsheetDateTimeField(serializers.DateTimeField):
+
+    def to_internal_value(self, value):
+        try:
+            value = SPREADSHEET_EPOCH + timedelta(days=float(value))
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return super().to_internal_value(value)
+
+
+class ApprovalImportSerializer(serializers.Serializer):
+    """record=approval: upserted on approval_no. work_thread is the thread number."""
+
+    approval_no = serializers.CharField(max_length=100)
+    work_thread = serializers.CharField(max_length=10)
+    approval_type = serializers.CharField(max_length=100)
+    approval_date = SpreadsheetDateField(required=False)
+    created_date = SpreadsheetDateField(required=False)
+
+    purpose = serializers.CharField(max_length=255, default='')
+    campus = serializers.CharField(max_length=255, default='')
+    department = serializers.CharField(max_length=255, default='')
+
+    vendor_name = serializers.CharField(max_length=255, default='')
+    vendor_address = serializers.CharField(default='')
+    vendor_contact = serializers.CharField(max_length=50, default='')
+
+    related_person_name = serializers.CharField(max_length=255, default='')
+    related_person_designation = serializers.CharField(max_length=255, default='')
+    related_person_contact = serializers.CharField(max_length=50, default='')
+
+    description = serializers.CharField(required=False)
+    amount_in_words = serializers.CharField(max_length=255, required=False)
+    comments = serializers.CharField(required=False)
+    item_received_date = SpreadsheetDateField(required=False)
+    expected_delivery_date = SpreadsheetDateField(required=False)
+    status = serializers.CharField(max_length=50, default='')
+
+    # sets the approval's payment master issue amount
+    total_issue_amount = serializers.DecimalField(max_digits=14, decimal_places=2, required=False)
+    payment_remarks = serializers.CharField(required=False)
+
+
+class ApprovalFlowImportSerializer(serializers.Serializer):
+    """record=flow: an approval's flow levels are replaced by the imported ones."""
+
+    approval_no = serializers.CharField(max_length=100)
+    level = serializers.IntegerField(min_value=1)
+    role = serializers.ChoiceField(choices=ApprovalFlow.ROLE_CHOICES)
+    name = serializers.CharField(max_length=255)
+    department = serializers.CharField(max_length=255, required=False)
+    approved_at = SpreadsheetDateTimeField(required=False)
+    remarks = serializers.CharField(required=False)
+
+
+class PaymentDetailImportSerializer(serializers.Serializer):
+    """record=payment: a transaction, upserted on (approval's payment master, sr_no)."""
+
+    approval_no = serializers.CharField(max_length=100)
+    sr_no = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax = serializers.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+    transaction_no = serializers.CharField(max_length=255)
+    transaction_date = SpreadsheetDateField()
+    transaction_by = serializers.CharField(max_length=255, default='')
 
+    signature = serializers.CharField(max_length=255, required=False)
+    received_by = serializers.CharField(max_length=255, default='')
+    bank_status = serializers.CharField(max_length=100, default='')
 
+    def validate(self, attrs):
+        attrs.setdefault('total', attrs['amount'] + attrs['tax'])
+        return attrs
@@ -1,8 +1,27 @@
 import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, OuterRef, Subquery, Value, When
+from django.utils import timezone
 from pywebpush import webpush, WebPushException
-from .models import PushSubscription
+
+from . import metrics  # noqa: F401  registers the Celery task timing signals
+from .gatepass import pop_gate_events, requeue_gate_events
+from .models import (
+    CLOSED_THREAD_STATUSES, GatePass, PushSubscription, ReminderThread, ThreadMessage, User,
+    WorkProgressUpdate, WorkThread, payment_drift, recalculate_payment_totals,
+)
+from .realtime import notify_chat, send_dashboard_events
+from .rollups import rebuild_rollups, refresh_dirty_rollups
+from .vehicle_board import board_mark_in, board_mark_out, rebuild_board
+
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=5)
@@ -56,3 +75,434 @@ def send_push_to_subscription(self, sub_id, payload):
     except Exception as exc:
         # Unknown error → retry
         raise self.retry(exc=exc)
+
+
+def push_to_users(payloads_by_user):
+    """
+    Queue web pushes for {user_id: [payload, ...]} with one subscription query.
+    """
+    subs = PushSubscription.objects.filter(
+        user_id__in=list(payloads_by_user)
+    ).values_list('id', 'user_id')
+
+    for sub_id, user_id in subs:
+        for payload in payloads_by_user[user_id]:
+            send_push_to_subscription.delay(sub_id, payload)
+
+
+@shared_task
+def deliver_due_reminders(batch_size=None):
+    """
+    Scheduler tick (Celery beat, every REMINDER_TICK_SECONDS).
+
+    Claims due occurrences through the partial next_fire_at index by
+    clearing next_fire_at and stamping this tick's delivered_at in one
+    conditional UPDATE, and only delivers the rows that carry this tick's
+    stamp, so overlapping workers never send the same occurrence twice.
+    Recurring series are re-armed with their next occurrence in the same
+    transaction, and pushes go out after it commits. Returns the number of
+    occurrences handled.
+    """
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    delivered = 0
+
+    while True:
+        now = timezone.now()
+
+        fire_times = dict(
+            ReminderThread.objects.filter(
+                next_fire_at__isnull=False,
+                next_fire_at__lte=now,
+            ).order_by('next_fire_at').values_list('id', 'next_fire_at')[:batch_size]
+        )
+        if not fire_times:
+            break
+        due_ids = list(fire_times)
+
+        stale_before = now - timedelta(seconds=settings.REMINDER_MAX_LATENESS)
+        pushes = defaultdict(list)
+        dashboard = defaultdict(list)
+        rearm = []
+
+        # claim + re-arm commit together: a series is never left with
+        # next_fire_at NULL if the worker dies between the two
+        with transaction.atomic():
+            ReminderThread.objects.filter(
+                id__in=due_ids,
+                next_fire_at__lte=now,
+            ).update(next_fire_at=None, delivered_at=now)
+
+            claimed = list(
+                ReminderThread.objects.filter(
+                    id__in=due_ids,
+                    delivered_at=now,
+                ).select_related('work_thread')
+            )
+
+            for reminder in claimed:
+                fired_at = fire_times[reminder.id]
+
+                if reminder.is_recurring:
+                    reminder.reschedule(after=now + timedelta(microseconds=1))
+                    if reminder.next_fire_at:
+                        rearm.append(reminder)
+
+                if fired_at < stale_before:
+                    continue
+                thread = reminder.work_thread
+                pushes[reminder.created_by_id].append({
+                    "title": f"Reminder: {thread.thread_number}",
+                    "body": reminder.message or thread.title,
+                    "url": f"{settings.FRONTEND_BASE_URL}/dashboard/requests/{thread.id}/",
+                })
+                dashboard[reminder.created_by_id].append({
+                    "id": reminder.id,
+                    "work_thread": thread.id,
+                    "work_thread_number": thread.thread_number,
+                    "title": thread.title,
+                    "message": reminder.message,
+                    "reminder_at": fired_at.isoformat(),
+                })
+
+            if rearm:
+                ReminderThread.objects.bulk_update(rearm, ['next_fire_at'])
+
+        # pushes only once the claim is committed
+        if pushes:
+            push_to_users(pushes)
+            send_dashboard_events({
+                uid: {"action": "reminders", "reminders": items}
+                for uid, items in dashboard.items()
+            })
+
+        delivered += len(claimed)
+        if len(due_ids) < batch_size:
+            break
+
+    return delivered
+
+
+def thread_audience(thread_ids):
+    """
+    {thread_id: {user ids}} = creator + assignees, in two queries.
+    """
+    audience = defaultdict(set)
+    for thread_id, creator_id in WorkThread.objects.filter(
+        id__in=thread_ids
+    ).values_list('id', 'created_by_id'):
+        audience[thread_id].add(creator_id)
+
+    for thread_id, user_id in WorkThread.assigned_to.through.objects.filter(
+        workthread_id__in=thread_ids
+    ).values_list('workthread_id', 'user_id'):
+        audience[thread_id].add(user_id)
+
+    return audience
+
+
+@shared_task
+def expire_gate_passes():
+    """
+    Periodic sweep (GATEPASS_EXPIRY_TICK_SECONDS): OUT passes past
+    valid_to become 'expired' in one UPDATE over the (status, valid_to)
+    index. Each affected user (holder, thread creator, assignees) gets one
+    aggregated dashboard event, however many passes expired.
+    """
+    now = timezone.now()
+
+    stale = list(
+        GatePass.objects.filter(
+            status='out',
+            valid_to__lt=now,
+        ).values_list('id', 'issued_to_id', 'thread_id')
+    )
+    if not stale:
+        return {"expired": 0, "users_notified": 0}
+
+    expired = GatePass.objects.filter(
+        id__in=[pass_id for pass_id, _, _ in stale],
+        status='out',
+    ).update(status='expired')
+
+    audience = thread_audience({thread_id for _, _, thread_id in stale})
+    per_user = defaultdict(list)
+    for pass_id, holder_id, thread_id in stale:
+        for uid in audience[thread_id] | {holder_id}:
+            per_user[uid].append(pass_id)
+
+    send_dashboard_events({
+        uid: {"action": "gate_passes_expired", "count": len(ids), "gate_passes": ids}
+        for uid, ids in per_user.items()
+    })
+
+    logger.info("Expired %s gate passes, notified %s users", expired, len(per_user))
+    return {"expired": expired, "users_notified": len(per_user)}
+
+
+
+# Statuses a kiosk scan may move a pass out of, per direction
+GATE_TRANSITIONS = {
+    "out": ('approved', 'out'),
+    "in": ('out', 'expired'),
+}
+
+
+def report_skipped_scans(scans, changed):
+    """Scans of passes that were not in a state to move (rejected, already IN, ...)."""
+    per_scanner = defaultdict(lambda: {"action": "gate_pass_scans_skipped", "out": [], "in": []})
+    for direction, by_id in scans.items():
+        applied = set(changed.get(direction, ()))
+        for pass_id, event in by_id.items():
+            if pass_id not in applied:
+                per_scanner[event["by"]][direction].append(pass_id)
+
+    for scanner_id, data in per_scanner.items():
+        logger.warning(
+            "Gate scans skipped (pass not in an allowed state): out=%s in=%s by user %s",
+            data["out"], data["in"], scanner_id,
+        )
+    send_dashboard_events(dict(per_scanner))
+
+
+def apply_gate_events(events):
+    """
+    Write kiosk scans (see glamth.gatepass). Per direction one locking
+    SELECT and one UPDATE, with each pass's scan time through CASE; passes
+    not in an allowed state are skipped. Then one dashboard event per
+    affected user and one chat event per thread and direction. The kiosk
+    already opened the barrier for skipped scans, so they are logged and
+    sent back to whoever scanned them.
+    """
+    # first scan of a pass in each direction wins
+    scans = {"out": {}, "in": {}}
+    for event in events:
+        if event["dir"] in scans:
+            scans[event["dir"]].setdefault(event["id"], event)
+
+    changed = {}
+    with transaction.atomic():
+        for direction in ("out", "in"):     # OUT then IN in the same batch works
+            by_id = scans[direction]
+            if not by_id:
+                continue
+            candidates = GatePass.objects.select_for_update().filter(
+                id__in=list(by_id),
+                status__in=GATE_TRANSITIONS[direction],
+            )
+            if direction == "out":
+                candidates = candidates.filter(in_time__isnull=True)
+            ids = list(candidates.values_list('id', flat=True))
+            if not ids:
+                continue
+
+            scanned_at = Case(
+                *[
+                    When(id=pass_id, then=Value(
+                        datetime.fromtimestamp(by_id[pass_id]["at"], tz=dt_timezone.utc)
+                    ))
+                    for pass_id in ids
+                ],
+                output_field=DateTimeField(),
+            )
+            GatePass.objects.filter(id__in=ids).update(
+                status=direction,
+                pass_mode=direction,
+                **{f"{direction}_time": scanned_at},
+            )
+            changed[direction] = ids
+
+    result = {
+        "out": len(changed.get("out", [])),
+        "in": len(changed.get("in", [])),
+    }
+    result["skipped"] = sum(len(s) for s in scans.values()) - result["out"] - result["in"]
+    if result["skipped"]:
+        report_skipped_scans(scans, changed)
+    if not changed:
+        return result
+
+    passes = {
+        pass_id: (holder_id, thread_id)
+        for pass_id, holder_id, thread_id in GatePass.objects.filter(
+            id__in=[pass_id for ids in changed.values() for pass_id in ids]
+        ).values_list('id', 'issued_to_id', 'thread_id')
+    }
+    audience = thread_audience({thread_id for _, thread_id in passes.values()})
+    scanner_names = dict(User.objects.filter(
+        id__in={scans[d][pass_id]["by"] for d, ids in changed.items() for pass_id in ids}
+    ).values_list('id', 'full_name'))
+
+    per_user = defaultdict(lambda: {"action": "gate_pass_scans", "out": [], "in": []})
+    chat_events = {}
+    for direction, ids in changed.items():
+        for pass_id in ids:
+            holder_id, thread_id = passes[pass_id]
+            for uid in audience[thread_id] | {holder_id}:
+                per_user[uid][direction].append(pass_id)
+            chat_events.setdefault((thread_id, direction), scans[direction][pass_id]["by"])
+
+    board_mark_out(changed.get("out"))
+    board_mark_in(changed.get("in"))
+
+    send_dashboard_events(dict(per_user))
+    for (thread_id, direction), scanner_id in chat_events.items():
+        notify_chat(thread_id, {
+            "event": f"gatepass_{direction}",
+            "by": scanner_names.get(scanner_id, "gate")
+        })
+
+    logger.info("Gate scans applied: %s", result)
+    return result
+
+
+@shared_task
+def flush_gate_events(batch_size=None):
+    """
+    Periodic (GATE_EVENT_FLUSH_SECONDS): drain the kiosk scan queue in
+    batches of GATE_EVENT_BATCH_SIZE. A batch that fails to write goes
+    back on the queue for the next tick.
+    """
+    batch_size = batch_size or settings.GATE_EVENT_BATCH_SIZE
+    totals = {"out": 0, "in": 0, "skipped": 0}
+
+    while True:
+        events = pop_gate_events(batch_size)
+        if not events:
+            break
+        try:
+            result = apply_gate_events(events)
+        except Exception:
+            requeue_gate_events(events)
+            raise
+        for key, value in result.items():
+            totals[key] += value
+        if len(events) < batch_size:
+            break
+
+    return totals
+
+
+
+@shared_task
+def rebuild_vehicle_board():
+    """Periodic self-heal of the vehicles-out board from the database."""
+    count = rebuild_board()
+    logger.info("Vehicle board rebuilt with %s entries", count)
+    return {"vehicles_out": count}
+
+
+@shared_task
+def reconcile_payment_totals(fix=True):
+    """
+    Compare every PaymentMaster with the sum of its PaymentDetail rows.
+    The per-row F() updates should keep them equal; anything listed here
+    was changed behind the model (raw SQL, admin bulk tools, restores).
+    """
+    drifted = list(
+        payment_drift().order_by('id').values(
+            'id', 'total_paid_amount', 'actual_paid', 'balance_amount', 'overall_status'
+        )
+    )
+    fixed = recalculate_payment_totals([row['id'] for row in drifted]) if fix and drifted else 0
+    if drifted:
+        logger.warning("Payment totals drifted on %s masters, fixed %s", len(drifted), fixed)
+    return {"drifted": drifted, "fixed": fixed}
+
+
+@shared_task
+def refresh_finance_rollups():
+    """Re-aggregate the finance rollups of months with changed claims / payments."""
+    months = refresh_dirty_rollups()
+    return {"months": [month.strftime("%Y-%m") for month in months]}
+
+
+@shared_task
+def rebuild_finance_rollups():
+    """Nightly full rebuild; also picks up category / department renames."""
+    count = rebuild_rollups()
+    logger.info("Finance rollups rebuilt with %s rows", count)
+    return {"rows": count}
+
+# Open states that turn into 'delayed' once the latest due date has passed
+DELAYABLE_STATUSES = ('pending', 'working')
+
+
+def overdue_threads(today):
+    """Open threads (any status but closed) whose latest expected_end_date is before today."""
+    latest_due_date = WorkProgressUpdate.objects.filter(
+        thread=OuterRef('pk')
+    ).order_by('-created_at').values('expected_end_date')[:1]
+
+    return WorkThread.objects.exclude(
+        status__in=CLOSED_THREAD_STATUSES
+    ).annotate(
+        latest_due=Subquery(latest_due_date)
+    ).filter(
+        latest_due__lt=today
+    )
+
+
+@shared_task
+def mark_overdue_threads_delayed(batch_size=None):
+    """
+    Nightly (and on demand via manage.py mark_delayed_threads): open
+    threads whose latest expected_end_date has passed become 'delayed'.
+    Their previous status is kept in status_before_delay so a new due date
+    can put it back.
+
+    Per batch: one UPDATE, one bulk_create of 'system' ThreadMessages;
+    afterwards one dashboard event per affected user and one chat event
+    per thread.
+    """
+    batch_size = batch_size or settings.DELAYED_SWEEP_BATCH_SIZE
+    today = timezone.now().date()
+    delayed = []
+
+    while True:
+        batch = list(
+            overdue_threads(today).filter(
+                status__in=DELAYABLE_STATUSES
+            ).values_list('id', 'created_by_id', 'latest_due')[:batch_size]
+        )
+        if not batch:
+            break
+
+        ids = [thread_id for thread_id, _, _ in batch]
+        with transaction.atomic():
+            WorkThread.objects.filter(
+                id__in=ids,
+                status__in=DELAYABLE_STATUSES,
+            ).update(status_before_delay=F('status'), status='delayed', updated_at=timezone.now())
+
+            ThreadMessage.objects.bulk_create([
+                ThreadMessage(
+                    thread_id=thread_id,
+                    sender_id=creator_id,
+                    message_type='system',
+                    text_message=f"Marked as delayed: expected completion was {due:%d %b %Y}.",
+                )
+                for thread_id, creator_id, due in batch
+            ])
+
+        delayed += ids
+        if len(batch) < batch_size:
+            break
+
+    if not delayed:
+        return {"delayed": 0, "users_notified": 0}
+
+    audience = thread_audience(delayed)
+    per_user = defaultdict(list)
+    for thread_id in delayed:
+        for uid in audience[thread_id]:
+            per_user[uid].append(thread_id)
+
+    send_dashboard_events({
+        uid: {"action": "threads_delayed", "count": len(ids), "threads": ids}
+        for uid, ids in per_user.items()
+    })
+    for thread_id in delayed:
+        notify_chat(thread_id, {"event": "thread_delayed", "by": "system"})
+
+    logger.info("Marked %s threads delayed, notified %s users", len(delayed), len(per_user))
+    return {"delayed": len(delayed), "users_notified": len(per_user)}
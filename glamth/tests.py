@@ -1,3 +1,994 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import redis
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+from django.core.files.storage import default_storage
+from asgiref.testing import ApplicationCommunicator
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from . import db_router
+from .backends import pooled_authenticate
+from .consumers import WS_CLOSE_BACKPRESSURE, StreamConsumer
+from .fast_serializers import (
+    serialize_thread_messages, serialize_today_reminders, serialize_today_threads, thread_messages,
+)
+from .imports import import_ledger
+from .metrics import prometheus_client
+from .outbound import OutboundQueue
+from .recurrence import iter_occurrences, next_occurrence, series_overlapping
+from .gatepass import InvalidGateToken, check_scan, make_gate_token
+from .models import (
+    Approval, FinanceRollupDirtyMonth, GatePass, PaymentDetail, PaymentMaster, ReminderThread, ThreadMessage, User, WorkProgressUpdate,
+    WorkThread, payment_drift, recalculate_payment_totals,
+)
+from .serializers import ThreadMessageSerializer, TodayReminderSerializer, TodayThreadListSerializer
+from .tasks import (
+    apply_gate_events, deliver_due_reminders, expire_gate_passes, mark_overdue_threads_delayed, rebuild_finance_rollups,
+    refresh_finance_rollups,
+)
+from .vehicle_board import BOARD_KEY, board_snapshot
+
+
+def make_user(employee_id="E1", **extra):
+    return User.objects.create_user(**{
+        "email": f"{employee_id.lower()}@example.com", "employee_id": employee_id,
+        "password": "x", "full_name": f"User {employee_id}", **extra
+    })
+
+
+def make_thread(user, **extra):
+    return WorkThread.objects.create(**{"title": "Thread", "description": "d", "created_by": user, **extra})
+
+
+def make_approval(thread, approval_no="A-1"):
+    return Approval.objects.create(
+        work_thread=thread, approval_no=approval_no, approval_type="t", purpose="p",
+        campus="c", department="d", vendor_name="v", vendor_address="a", vendor_contact="1",
+        related_person_name="r", related_person_designation="d", related_person_contact="1",
+        status="ok",
+    )
+
+
+def make_payment(master, sr_no, total, **extra):
+    return PaymentDetail.objects.create(**{
+        "payment_master": master, "sr_no": sr_no, "amount": total, "tax": 0, "total": total,
+        "transaction_no": f"T{sr_no}", "transaction_date": date.today(),
+        "transaction_by": "x", "received_by": "y", "bank_status": "ok", **extra
+    })
+
+
+class PaymentTotalsTests(TestCase):
+
+    def setUp(self):
+        user = make_user()
+        self.master = PaymentMaster.objects.create(
+            approval=make_approval(make_thread(user)), total_issue_amount=Decimal("0.30")
+        )
+
+    def test_cent_amounts_add_up_exactly(self):
+        # 0.10 + 0.20 is 0.30000000000000004 in floating point
+        make_payment(self.master, 1, Decimal("0.10"))
+        make_payment(self.master, 2, Decimal("0.20"))
+
+        self.master.refresh_from_db()
+        self.assertEqual(self.master.total_paid_amount, Decimal("0.30"))
+        self.assertEqual(self.master.balance_amount, Decimal("0.00"))
+        self.assertEqual(self.master.overall_status, "paid")
+        self.assertFalse(payment_drift().exists())
+
+    def test_drift_found_for_unrounded_total(self):
+        make_payment(self.master, 1, Decimal("0.10"))
+        make_payment(self.master, 2, Decimal("0.20"))
+        PaymentMaster.objects.filter(pk=self.master.pk).update(
+            total_paid_amount=Decimal("0.30000000000000004")
+        )
+
+        self.assertEqual(list(payment_drift().values_list("pk", flat=True)), [self.master.pk])
+        self.assertEqual(recalculate_payment_totals(), 1)
+        self.master.refresh_from_db()
+        self.assertEqual(self.master.overall_status, "paid")
+
+
+class FinanceAccessTests(APITestCase):
+
+    def setUp(self):
+        self.employee = make_user("E1", role=6)
+        self.cfo = make_user("E2", role=1)
+
+    def get(self, user, url):
+        self.client.force_authenticate(user)
+        return self.client.get(url)
+
+    def test_finance_exports_need_finance_user(self):
+        self.assertEqual(self.get(self.employee, "/api/exports/payments.csv").status_code, 403)
+        self.assertEqual(self.get(self.employee, "/api/exports/payment-details.csv").status_code, 403)
+        self.assertEqual(self.get(self.cfo, "/api/exports/payments.csv").status_code, 200)
+
+    def test_rollups_need_finance_user(self):
+        self.assertEqual(self.get(self.employee, "/api/finance/rollups/").status_code, 403)
+        self.assertEqual(self.get(self.cfo, "/api/finance/rollups/").status_code, 200)
+
+    def test_approval_ledger_needs_finance_user(self):
+        self.assertEqual(self.get(self.employee, "/api/approvals/").status_code, 403)
+        self.assertEqual(self.get(self.cfo, "/api/approvals/").status_code, 200)
+        self.assertEqual(self.get(self.cfo, "/api/approvals/?work_thread=abc").status_code, 400)
+
+
+@mock.patch("glamth.gatepass.get_redis", side_effect=redis.ConnectionError)
+class GateTokenTests(TestCase):
+    """Redis is down here, so scans are checked against the pass status."""
+
+    def setUp(self):
+        self.user = make_user()
+        now = timezone.now()
+        self.gate_pass = GatePass.objects.create(
+            thread=make_thread(self.user), issued_to=self.user, purpose="p",
+            valid_from=now - timedelta(hours=1), valid_to=now + timedelta(hours=1),
+        )
+
+    def set_status(self, status):
+        GatePass.objects.filter(pk=self.gate_pass.pk).update(status=status)
+        self.gate_pass.refresh_from_db()
+
+    def test_no_token_until_approved(self, _):
+        self.assertIsNone(make_gate_token(self.gate_pass))
+        self.set_status("rejected")
+        self.assertIsNone(make_gate_token(self.gate_pass))
+
+    def test_token_is_for_one_direction(self, _):
+        self.set_status("approved")
+        token = make_gate_token(self.gate_pass)
+        with self.assertRaises(InvalidGateToken):
+            check_scan(token, "in", timezone.now())
+        self.assertEqual(check_scan(token, "out", timezone.now())["id"], self.gate_pass.id)
+
+    def test_token_stops_working_once_rejected(self, _):
+        self.set_status("approved")
+        token = make_gate_token(self.gate_pass)
+        self.set_status("rejected")
+        with self.assertRaises(InvalidGateToken):
+            check_scan(token, "out", timezone.now())
+
+    def test_skipped_scans_are_reported(self, _):
+        self.set_status("rejected")
+        event = {"id": self.gate_pass.id, "dir": "out", "by": self.user.id, "at": timezone.now().timestamp()}
+        with mock.patch("glamth.tasks.send_dashboard_events") as send:
+            result = apply_gate_events([event])
+        self.assertEqual(result["skipped"], 1)
+        send.assert_called_once_with({self.user.id: {
+            "action": "gate_pass_scans_skipped", "out": [self.gate_pass.id], "in": [],
+        }})
+
+
+class SignedMediaTests(APITestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, MEDIA_REQUIRE_AUTH=True))
+        self.name = default_storage.save("documents/bill.txt", ContentFile(b"bill"))
+
+    def test_signed_url_serves_without_token(self):
+        url = default_storage.url(self.name)
+        self.assertIn("sig=", url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"bill")
+
+    def test_unsigned_or_tampered_url_is_refused(self):
+        plain = default_storage.url(self.name).split("?")[0]
+        self.assertEqual(self.client.get(plain).status_code, 401)
+        self.assertEqual(self.client.get(plain + "?expires=9999999999&sig=x").status_code, 401)
+
+    def test_header_auth_is_staff_only(self):
+        plain = default_storage.url(self.name).split("?")[0]
+        self.client.force_login(make_user("E1"))
+        self.assertEqual(self.client.get(plain).status_code, 403)
+        self.client.force_login(make_user("E2", is_staff=True))
+        self.assertEqual(self.client.get(plain).status_code, 200)
+
+
+class PooledLoginTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user("E1")
+
+    def test_password_checked(self):
+        self.assertEqual(pooled_authenticate(email="e1@example.com", password="x"), self.user)
+        self.assertIsNone(pooled_authenticate(email="e1@example.com", password="wrong"))
+        self.assertIsNone(pooled_authenticate(email="nobody@example.com", password="x"))
+
+    @override_settings(PASSWORD_HASHERS=[
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+    ])
+    def test_outdated_hash_upgraded(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("x", hasher="md5"))
+
+        self.assertEqual(pooled_authenticate(email="e1@example.com", password="x"), self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class StreamConsumerTests(SimpleTestCase):
+
+    async def connect(self):
+        user = mock.Mock(is_authenticated=True, id=1)
+        socket = ApplicationCommunicator(StreamConsumer.as_asgi(), {
+            "type": "websocket", "path": "/ws/stream/", "user": user, "url_route": {"kwargs": {}},
+        })
+        await socket.send_input({"type": "websocket.connect"})
+        self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+        return socket
+
+    async def reply(self, socket, payload):
+        await socket.send_input({"type": "websocket.receive", "text": json.dumps(payload)})
+        return json.loads((await socket.receive_output(2))["text"])
+
+    async def test_malformed_messages_get_error_frames(self):
+        socket = await self.connect()
+        for payload in ([], 1, "x", {"action": "subscribe", "topics": "dashboard"},
+                        {"action": "subscribe", "topics": [["chat:1"]]},
+                        {"action": "subscribe", "topic": {"a": 1}}):
+            self.assertEqual((await self.reply(socket, payload))["type"], "error", payload)
+
+        frame = await self.reply(socket, {"action": "subscribe", "topics": ["dashboard"]})
+        self.assertEqual(frame, {"type": "subscribed", "topic": "dashboard"})
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(1)
+
+    @override_settings(WS_MAX_QUEUED_FRAMES=0, WS_OVERFLOW_POLICY="close")
+    async def test_overflow_close_stops_queueing(self):
+        socket = await self.connect()
+        await socket.send_input({"type": "websocket.receive", "text": json.dumps({"action": "subscribe", "topic": "dashboard"})})
+        self.assertEqual(await socket.receive_output(1), {"type": "websocket.close", "code": WS_CLOSE_BACKPRESSURE})
+
+        await socket.send_input({"type": "websocket.receive", "text": "[]"})
+        self.assertTrue(await socket.receive_nothing(0.2))
+        await socket.send_input({"type": "websocket.disconnect", "code": WS_CLOSE_BACKPRESSURE})
+        await socket.wait(1)
+
+
+class OutboundQueueTests(SimpleTestCase):
+
+    async def test_idle_frames_are_not_delayed_and_bursts_merge(self):
+        sent = []
+
+        async def send(frame):
+            sent.append(frame)
+
+        queue = OutboundQueue(send, window=0.1, max_frames=10)
+        queue.start()
+        queue.put("a", key="a")
+        await asyncio.sleep(0)
+        self.assertEqual(sent, ["a"])   # well inside the window
+
+        queue.put("a", key="a")
+        queue.put("a", key="a")
+        await asyncio.sleep(0.05)
+        self.assertEqual(sent, ["a"])
+        await asyncio.sleep(0.1)
+        self.assertEqual(sent, ["a", "a"])
+        queue.stop()
+        self.assertFalse(queue.put("b"))
+
+    async def test_send_error_stops_queue_and_reports(self):
+        failed = asyncio.Event()
+
+        async def send(frame):
+            raise OSError("transport gone")
+
+        async def on_error():
+            failed.set()
+
+        queue = OutboundQueue(send, window=0, max_frames=10, on_error=on_error)
+        queue.start()
+        with self.assertLogs("glamth.outbound", "ERROR"):
+            queue.put("a")
+            await asyncio.wait_for(failed.wait(), 1)
+        self.assertFalse(queue.put("b"))
+
+
+class LedgerImportTests(TestCase):
+
+    def setUp(self):
+        self.thread = make_thread(make_user())
+
+    def run_import(self, text):
+        result = import_ledger(io.BytesIO(text.encode()), "csv")
+        self.assertEqual(result["errors"], [])
+        return result
+
+    def test_reimport_keeps_columns_it_leaves_out(self):
+        number = self.thread.thread_number
+        self.run_import(
+            "record,approval_no,work_thread,approval_type,vendor_name,description,approval_date,"
+            "sr_no,amount,tax,transaction_no,transaction_date,bank_status\n"
+            f"approval,A-1,{number},capex,Acme,New chairs,2026-01-05,,,,,,\n"
+            "payment,A-1,,,,,,1,100,18,T1,2026-01-10,cleared\n"
+        )
+        self.run_import(
+            "record,approval_no,work_thread,approval_type,description,sr_no,amount,transaction_no,transaction_date\n"
+            f"approval,A-1,{number},opex,,,,,\n"
+            "payment,A-1,,,,1,200,T1,2026-01-10\n"
+        )
+
+        approval = Approval.objects.get(approval_no="A-1")
+        self.assertEqual(approval.approval_type, "opex")
+        self.assertEqual(approval.vendor_name, "Acme")
+        self.assertEqual(approval.description, "New chairs")
+        self.assertEqual(approval.approval_date, date(2026, 1, 5))
+
+        payment = PaymentDetail.objects.get(payment_master__approval=approval, sr_no=1)
+        self.assertEqual(payment.amount, Decimal("200"))
+        self.assertEqual(payment.tax, Decimal("18"))
+        self.assertEqual(payment.total, Decimal("218"))
+        self.assertEqual(payment.bank_status, "cleared")
+
+
+class FastSerializerTests(TestCase):
+    """The plain-dict serializers render exactly what the DRF ones do."""
+
+    def setUp(self):
+        user = make_user()
+        now = timezone.now()
+        self.threads = [make_thread(user, title=f"T{i}") for i in range(3)]
+        WorkThread.objects.filter(pk=self.threads[1].pk).update(thread_number=None)
+
+        for days in (3, 5):
+            WorkProgressUpdate.objects.create(
+                thread=self.threads[0], updated_by=user, progress_type="working",
+                expected_end_date=date.today() + timedelta(days=days),
+            )
+        for thread, message in zip(self.threads, ("call vendor", None, "")):
+            ReminderThread.objects.create(
+                work_thread=thread, reminder_at=now, message=message, created_by=user,
+            )
+
+    def assertSameJSON(self, drf_data, plain_data):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(plain_data), renderer.render(drf_data))
+
+    def test_today_threads(self):
+        threads = WorkThread.objects.order_by("id")
+        self.assertSameJSON(
+            TodayThreadListSerializer(threads.select_related("created_by"), many=True).data,
+            serialize_today_threads(threads),
+        )
+
+    def test_today_reminders(self):
+        reminders = list(ReminderThread.objects.select_related(
+            "work_thread", "work_thread__created_by"
+        ).order_by("id"))
+        self.assertSameJSON(
+            TodayReminderSerializer(reminders, many=True).data,
+            serialize_today_reminders(reminders),
+        )
+
+    def test_thread_messages(self):
+        sender, receiver = User.objects.get(), make_user("E2", full_name="")
+        thread = self.threads[1]   # thread_number NULL
+        for kwargs in (
+            {"text_message": "hi"},                                          # group
+            {"receiver": receiver, "text_message": None},                    # direct, blank name
+            {"message_type": "image", "media_file": "thread_messages/a.png"},
+            {"receiver": receiver, "message_type": "document", "media_file": "thread_messages/b c.pdf"},
+        ):
+            ThreadMessage.objects.create(thread=thread, sender=sender, **kwargs)
+        ThreadMessage.objects.create(thread=thread, sender=receiver, receiver=sender, text_message="ok")
+
+        messages = thread_messages(thread.id)
+        self.assertSameJSON(
+            ThreadMessageSerializer(messages.select_related("sender", "receiver"), many=True).data,
+            serialize_thread_messages(messages),
+        )
+
+
+@unittest.skipIf(prometheus_client is None, "prometheus_client is not installed")
+class MetricsEndpointTests(SimpleTestCase):
+
+    @override_settings(METRICS_TOKEN="", METRICS_ALLOWED_IPS=[])
+    def test_refused_without_token_or_allowed_ip(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="s3cret", METRICS_ALLOWED_IPS=[])
+    def test_served_with_token(self):
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"glathread_http_request_seconds", response.content)
+
+    @override_settings(METRICS_TOKEN="", METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_served_to_allowed_ip(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.5").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.6").status_code, 403)
+
+
+@mock.patch("glamth.tasks.notify_chat")
+@mock.patch("glamth.tasks.send_dashboard_events")
+class OverdueThreadTests(APITestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.threads = {
+            status: make_thread(self.user, status=status, title=status)
+            for status in ("pending", "payment_pending", "completed")
+        }
+        for thread in self.threads.values():
+            WorkProgressUpdate.objects.create(
+                thread=thread, updated_by=self.user, progress_type="initial",
+                expected_end_date=date.today() - timedelta(days=2),
+            )
+
+    def overdue(self):
+        with mock.patch("glamth.views.notify_dashboard"):
+            data = self.client.get("/api/dashboard-counts/").json()["overdue"]
+        return sorted(thread["title"] for thread in data["threads"])
+
+    def test_overdue_from_due_date_before_and_after_sweep(self, *_):
+        self.assertEqual(self.overdue(), ["payment_pending", "pending"])
+        mark_overdue_threads_delayed()
+        self.assertEqual(self.overdue(), ["payment_pending", "pending"])
+        self.assertEqual(WorkThread.objects.get(title="payment_pending").status, "payment_pending")
+
+    def test_new_due_date_restores_previous_status(self, *_):
+        mark_overdue_threads_delayed()
+        thread = WorkThread.objects.get(title="pending")
+        self.assertEqual(thread.status, "delayed")
+
+        with mock.patch("glamth.views.notify_dashboard"):
+            response = self.client.post("/api/work-progress/", {
+                "thread": thread.id, "progress_type": "delay", "delay_reason": "parts",
+                "expected_end_date": str(date.today() + timedelta(days=3)),
+            })
+        self.assertEqual(response.status_code, 201)
+        thread.refresh_from_db()
+        self.assertEqual((thread.status, thread.status_before_delay), ("pending", None))
+
+
+@mock.patch("glamth.vehicle_board.notify_vehicles_out")
+@mock.patch("glamth.vehicle_board.get_redis")
+class VehicleBoardTests(APITestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.gate_pass = GatePass.objects.create(
+            thread=make_thread(self.user), issued_to=self.user, purpose="p", status="out",
+            out_time=now, valid_from=now - timedelta(hours=1), valid_to=now + timedelta(hours=1),
+        )
+
+    def test_missing_hash_is_rebuilt_from_database(self, get_redis, _):
+        get_redis.return_value.hgetall.return_value = {}   # evicted / flushed
+        vehicles = board_snapshot()
+        self.assertEqual([v["id"] for v in vehicles], [self.gate_pass.id])
+        get_redis.return_value.pipeline.return_value.rename.assert_called_once_with(
+            f"{BOARD_KEY}:rebuild", BOARD_KEY
+        )
+
+    @override_settings(DATABASE_ROUTERS=["glamth.db_router.ReplicaRouter"])
+    def test_rebuild_reads_the_primary_in_replica_routed_requests(self, get_redis, _):
+        get_redis.return_value.hgetall.return_value = {}
+        token = db_router._routing.set({"replica": True, "wrote": False})
+        self.addCleanup(db_router._routing.reset, token)
+        used = []
+        with mock.patch("glamth.vehicle_board.board_entries", side_effect=lambda qs: used.append(qs.db) or {}), \
+                mock.patch.object(connection, "in_atomic_block", False):   # TestCase's own transaction
+            board_snapshot()
+        self.assertEqual(used, [DEFAULT_DB_ALIAS])
+
+    def test_edit_and_delete_update_the_hash(self, get_redis, _):
+        pipe = get_redis.return_value.pipeline.return_value
+        valid_to = timezone.now() + timedelta(hours=5)
+        response = self.client.patch(
+            f"/api/gate-passes/{self.gate_pass.id}/", {"valid_to": valid_to.isoformat()}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        entry = json.loads(pipe.hset.call_args.kwargs["mapping"][self.gate_pass.id])
+        self.assertEqual(datetime.fromisoformat(entry["valid_to"]), valid_to)
+
+        response = self.client.delete(f"/api/gate-passes/{self.gate_pass.id}/")
+        self.assertEqual(response.status_code, 204)
+        pipe.hdel.assert_called_once_with(BOARD_KEY, self.gate_pass.id)
+
+
+@mock.patch("glamth.tasks.send_dashboard_events")
+@mock.patch("glamth.tasks.push_to_users")
+class DeliverRemindersTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.thread = make_thread(self.user)
+        self.due = timezone.now() - timedelta(minutes=1)
+
+    def make_reminder(self, **extra):
+        return ReminderThread.objects.create(
+            work_thread=self.thread, created_by=self.user, reminder_at=self.due, **extra
+        )
+
+    def pushed(self, push):
+        return sum(len(items) for call in push.call_args_list for items in call.args[0].values())
+
+    def test_overlapping_ticks_deliver_once(self, push, _):
+        self.make_reminder()
+        self.make_reminder(recurrence="daily")
+        real_atomic = transaction.atomic
+        overlapped = []
+
+        def atomic(*args, **kwargs):
+            # a second worker claims between this tick's select and its claim
+            if not overlapped:
+                overlapped.append(None)
+                overlapped[0] = deliver_due_reminders()
+            return real_atomic(*args, **kwargs)
+
+        with mock.patch("glamth.tasks.transaction.atomic", side_effect=atomic):
+            first = deliver_due_reminders()
+        self.assertEqual((overlapped, first), ([2], 0))
+        self.assertEqual(self.pushed(push), 2)
+
+    def test_recurring_reminder_is_rearmed(self, push, _):
+        reminder = self.make_reminder(recurrence="daily")
+        self.assertEqual(deliver_due_reminders(), 1)
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.next_fire_at, self.due + timedelta(days=1))
+        self.assertEqual(deliver_due_reminders(), 0)
+
+    def test_failed_rearm_leaves_occurrence_pending(self, push, _):
+        reminder = self.make_reminder(recurrence="weekly")
+        with mock.patch.object(ReminderThread.objects, "bulk_update", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                deliver_due_reminders()
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.next_fire_at, reminder.delivered_at), (self.due, None))
+        push.assert_not_called()
+
+
+class RecurrenceTests(TestCase):
+
+    def series(self, recurrence, first, **extra):
+        return ReminderThread(recurrence=recurrence, reminder_at=first, **extra)
+
+    def test_monthly_on_the_31st_clamps_to_month_end(self):
+        reminder = self.series("monthly", datetime(2026, 1, 31, 9, tzinfo=dt_timezone.utc))
+        days = [o.date() for o in iter_occurrences(
+            reminder, datetime(2026, 1, 1, tzinfo=dt_timezone.utc), datetime(2026, 6, 1, tzinfo=dt_timezone.utc)
+        )]
+        self.assertEqual(days, [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31),
+                                date(2026, 4, 30), date(2026, 5, 31)])
+
+    def test_count_and_until_end_the_series(self):
+        first = datetime(2026, 3, 2, 8, tzinfo=dt_timezone.utc)
+        window = (first - timedelta(days=1), first + timedelta(days=30))
+
+        by_count = self.series("daily", first, recurrence_count=3)
+        self.assertEqual(len(list(iter_occurrences(by_count, *window))), 3)
+        self.assertIsNone(next_occurrence(by_count, first + timedelta(days=2)))
+
+        by_until = self.series("daily", first, recurrence_until=first + timedelta(days=4))
+        self.assertEqual(list(iter_occurrences(by_until, *window))[-1], first + timedelta(days=4))
+        self.assertIsNone(next_occurrence(by_until, first + timedelta(days=4)))
+
+    def test_interval_above_one(self):
+        first = datetime(2026, 3, 2, 8, tzinfo=dt_timezone.utc)
+        weekly = self.series("weekly", first, recurrence_interval=2)
+        self.assertEqual(next_occurrence(weekly, first), first + timedelta(weeks=2))
+        # window starting mid-period lands on the next on-schedule occurrence
+        start = first + timedelta(weeks=3)
+        self.assertEqual(next(iter_occurrences(weekly, start, start + timedelta(weeks=4))),
+                         first + timedelta(weeks=4))
+
+        monthly = self.series("monthly", first, recurrence_interval=3)
+        self.assertEqual(next_occurrence(monthly, first), datetime(2026, 6, 2, 8, tzinfo=dt_timezone.utc))
+
+    def test_series_overlapping_range_edges(self):
+        user = make_user()
+        thread = make_thread(user)
+        start = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+        end = start + timedelta(days=7)
+
+        def create(title, first, **extra):
+            return ReminderThread.objects.create(
+                work_thread=thread, created_by=user, reminder_at=first, message=title, **extra
+            )
+
+        create("starts at end", end, recurrence="daily")
+        create("until before start", start - timedelta(days=10), recurrence="daily",
+               recurrence_until=start - timedelta(microseconds=1))
+        create("until at start", start - timedelta(days=10), recurrence="daily", recurrence_until=start)
+        create("open ended", start - timedelta(days=400), recurrence="weekly")
+        create("one-off", start)
+
+        found = series_overlapping(ReminderThread.objects.all(), start, end)
+        self.assertEqual(sorted(r.message for r in found), ["open ended", "until at start"])
+
+    def test_api_rejects_zero_interval(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post("/api/reminders/", {
+            "work_thread": make_thread(user).id, "reminder_at": timezone.now().isoformat(),
+            "recurrence": "daily", "recurrence_interval": 0,
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("recurrence_interval", response.json())
+
+
+class FinanceRollupTests(APITestCase):
+
+    def setUp(self):
+        self.cfo = make_user("E1", role=1)
+        self.client.force_authenticate(self.cfo)
+        self.master = PaymentMaster.objects.create(
+            approval=make_approval(make_thread(self.cfo)), total_issue_amount=Decimal("1000.00")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.payments = [
+                make_payment(self.master, 1, Decimal("100.10"), transaction_date=date(2026, 1, 5)),
+                make_payment(self.master, 2, Decimal("200.25"), transaction_date=date(2026, 1, 31)),
+                make_payment(self.master, 3, Decimal("50.00"), transaction_date=date(2026, 2, 1)),
+            ]
+
+    def live_totals(self):
+        totals = {}
+        for payment in PaymentDetail.objects.all():
+            month = payment.transaction_date.strftime("%Y-%m")
+            totals[month] = totals.get(month, 0) + payment.total
+        return totals
+
+    def report(self, query=""):
+        data = self.client.get(f"/api/finance/rollups/?source=paid{query}").json()
+        return data, {row["month"]: row["amount"] for row in data["rows"]}
+
+    def test_refresh_and_rebuild_match_live_sums(self):
+        refresh_finance_rollups()
+        _, refreshed = self.report()
+        rebuild_finance_rollups()
+        _, rebuilt = self.report()
+        live = {month: float(total) for month, total in self.live_totals().items()}
+        self.assertEqual(refreshed, live)
+        self.assertEqual(rebuilt, live)
+
+    def test_payment_edit_marks_its_month_dirty(self):
+        rebuild_finance_rollups()
+        self.assertFalse(FinanceRollupDirtyMonth.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = self.payments[2]
+            payment.total = Decimal("75.50")
+            payment.save()
+        self.assertEqual(refresh_finance_rollups(), {"months": ["2026-02"]})
+        self.assertEqual(self.report()[1]["2026-02"], 75.5)
+
+    def test_empty_group_by_falls_back_to_month(self):
+        rebuild_finance_rollups()
+        data, _ = self.report("&group_by=")
+        self.assertEqual(data["group_by"], ["month"])
+        self.assertEqual(set(data["rows"][0]), {"month", "amount", "count"})
+
+
+class FakeTokenBucket:
+    """Stands in for the Lua script (no Redis here): same capacity / refill rule."""
+
+    def __init__(self):
+        self.buckets = {}
+
+    def __call__(self, keys, args):
+        capacity, rate, now = args
+        tokens, ts = self.buckets.get(keys[0], (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - ts) * rate)
+        if tokens >= 1:
+            self.buckets[keys[0]] = (tokens - 1, now)
+            return [1, "0"]
+        self.buckets[keys[0]] = (tokens, now)
+        return [0, str((1 - tokens) / rate)]
+
+
+@override_settings(THROTTLE_BUCKETS={"login_email": (3, 1 / 3600), "login_ip": (100, 1)})
+class LoginThrottleTests(APITestCase):
+
+    def setUp(self):
+        make_user()
+        patcher = mock.patch("glamth.throttling.get_redis", return_value=FakeTokenBucket())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, data):
+        return self.client.post("/api/login/", data, format="json")
+
+    def test_email_bucket_throttles_after_burst(self):
+        for _ in range(3):
+            self.assertEqual(self.login({"email": "E1@example.com ", "password": "wrong"}).status_code, 400)
+        response = self.login({"email": "e1@example.com", "password": "x"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.login({"email": "other@example.com", "password": "x"}).status_code, 400)
+
+    def test_non_object_body_is_a_400(self):
+        for body in ([{"email": "e1@example.com"}], "e1@example.com", 1):
+            self.assertEqual(self.login(body).status_code, 400, body)
+
+
+@mock.patch("glamth.views.notify_chat")
+@mock.patch("glamth.views.notify_dashboard")
+class BulkApprovalTests(APITestCase):
+
+    URL = "/api/threads/bulk-approve-reject/"
+
+    def setUp(self):
+        self.registrar = make_user("E1", role=2)
+        self.creator = make_user("E2", role=6)
+        self.assignee = make_user("E3", role=6)
+        self.pending = [make_thread(self.creator, title=f"P{i}") for i in range(2)]
+        self.pending[1].assigned_to.add(self.assignee)
+        self.decided = make_thread(self.creator, title="D", approval_status="rejected", status="rejected")
+        self.client.force_authenticate(self.registrar)
+
+    def decide(self, thread_ids, approval_status="approved", **extra):
+        return self.client.post(self.URL, {
+            "thread_ids": thread_ids, "approval_status": approval_status, **extra
+        }, format="json")
+
+    def test_mixed_ids_are_reported(self, dashboard, chat):
+        p0, p1 = (t.id for t in self.pending)
+        response = self.decide([p0, self.decided.id, 999999, p1, p0])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            (data["updated"], data["already_decided"], data["not_found"]),
+            ([p0, p1], [self.decided.id], [999999]),
+        )
+        self.assertEqual(data["message"], "2 threads approved successfully")
+
+        statuses = dict(WorkThread.objects.values_list("title", "status"))
+        self.assertEqual(statuses, {"P0": "working", "P1": "working", "D": "rejected"})
+        self.assertEqual(set(WorkThread.objects.filter(id__in=[p0, p1]).values_list("approved_by", flat=True)),
+                         {self.registrar.id})
+
+        # one dashboard refresh for everyone affected, one chat event per thread
+        dashboard.assert_called_once_with({self.creator.id, self.assignee.id})
+        self.assertEqual(sorted(call.args[0] for call in chat.call_args_list), [p0, p1])
+
+    def test_repeat_is_idempotent(self, dashboard, chat):
+        ids = [t.id for t in self.pending]
+        self.decide(ids, "rejected", approval_remark="budget")
+        before = list(WorkThread.objects.order_by("id").values("status", "approval_remark", "approval_at"))
+        dashboard.reset_mock()
+        chat.reset_mock()
+
+        data = self.decide(ids, "approved").json()
+        self.assertEqual((data["updated"], data["already_decided"]), ([], ids))
+        self.assertEqual(list(WorkThread.objects.order_by("id").values("status", "approval_remark", "approval_at")),
+                         before)
+        self.assertEqual(before[0]["approval_remark"], "budget")
+        dashboard.assert_not_called()
+        chat.assert_not_called()
+
+    def test_non_approvers_cannot_decide(self, dashboard, chat):
+        self.client.force_authenticate(self.creator)
+        ids = [t.id for t in self.pending]
+        self.assertEqual(self.decide(ids).status_code, 403)
+        self.assertEqual(
+            self.client.patch(f"/api/threads/{ids[0]}/approve-reject/", {"approval_status": "approved"}).status_code,
+            403,
+        )
+        self.assertFalse(WorkThread.objects.exclude(approval_status__in=["pending", "rejected"]).exists())
+        dashboard.assert_not_called()
+
+
+class ThreadListTests(APITestCase):
+
+    URL = "/api/threads/"
+
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user("E2")
+        self.client.force_authenticate(self.user)
+
+    def facets(self, query):
+        data = self.client.get(f"{self.URL}?{query}&facets=status,vehicle_type").json()
+        return {
+            name: {item["value"]: item["count"] for item in items}
+            for name, items in data["facets"].items()
+        }
+
+    def test_facet_counts_follow_the_other_filters(self):
+        for creator, status, approval, vehicle in (
+            (self.user, "pending", "pending", "bus"),
+            (self.user, "working", "approved", "bus"),
+            (self.user, "working", "approved", "car"),
+            (self.user, "rejected", "rejected", "car"),
+            (self.other, "working", "approved", "bus"),
+        ):
+            make_thread(creator, status=status, approval_status=approval, vehicle_type=vehicle)
+
+        self.assertEqual(self.facets(f"approval_status=approved&creator={self.user.id}"), {
+            "status": {"working": 2}, "vehicle_type": {"bus": 1, "car": 1},
+        })
+        self.assertEqual(self.facets("vehicle_type=bus"), {
+            "status": {"pending": 1, "working": 2}, "vehicle_type": {"bus": 3},
+        })
+
+    def test_cursor_pages_are_stable_when_timestamps_tie(self):
+        threads = [make_thread(self.user, title=f"T{i}") for i in range(7)]
+        tied = timezone.now() - timedelta(hours=1)
+        WorkThread.objects.filter(id__in=[t.id for t in threads[:5]]).update(created_at=tied)
+        expected = list(WorkThread.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        seen, url = [], f"{self.URL}?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [row["id"] for row in data["results"]]
+            url = data["next"]
+            if len(seen) == 2:
+                make_thread(self.user, title="new")   # newer rows never shift later pages
+        self.assertEqual(seen, expected)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(APITestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        for title, day in (("before", date(2026, 1, 31)), ("first", date(2026, 2, 1)),
+                           ("=formula", date(2026, 2, 14)), ("last", date(2026, 2, 28)),
+                           ("after", date(2026, 3, 1))):
+            thread = make_thread(self.user, title=title)
+            WorkThread.objects.filter(pk=thread.pk).update(
+                created_at=timezone.make_aware(datetime.combine(day, datetime.min.time()))
+            )
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_month_is_streamed_in_chunks(self):
+        body = self.export("/api/exports/threads.csv?month=2026-02").decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:2], ["Thread No", "Title"])
+        self.assertEqual([row[1] for row in rows[1:]], ["first", "'=formula", "last"])
+
+    def test_xlsx_is_a_readable_workbook(self):
+        body = self.export("/api/exports/threads.xlsx?from=2026-02-01&to=2026-02-01")
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 2)
+        self.assertIn(">first<", sheet)
+
+    def test_date_params_share_one_error_format(self):
+        for url, param in (("/api/exports/threads.csv?from=2026-02-30", "from"),
+                           ("/api/exports/threads.csv?month=2026-13", "month"),
+                           ("/api/threads/?created_to=feb", "created_to")):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn(param, response.json(), url)
+
+
+class AgendaTests(APITestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.thread = make_thread(self.user, title="bus service")
+
+    def at(self, day, hour=0, **extra):
+        return datetime(2026, 3, day, hour, tzinfo=dt_timezone.utc, **extra)
+
+    def remind(self, reminder_at, user=None, **extra):
+        return ReminderThread.objects.create(
+            work_thread=self.thread, created_by=user or self.user, reminder_at=reminder_at, **extra
+        )
+
+    def due(self, title, day, **extra):
+        thread = make_thread(self.user, title=title, **extra)
+        WorkProgressUpdate.objects.create(
+            thread=thread, updated_by=self.user, progress_type="initial", expected_end_date=day,
+        )
+        return thread
+
+    def agenda(self, query="from=2026-03-02&to=2026-03-03"):
+        response = self.client.get(f"/api/reminders/agenda/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item["kind"], item["at"], item["recurrence"], item["title"])
+            for item in response.json()["items"]
+        ]
+
+    def test_one_off_recurring_and_due_items_share_the_window(self):
+        self.remind(self.at(2), message="midnight")                       # window start
+        self.remind(self.at(3, 23, minute=59, second=59, microsecond=999999))
+        self.remind(self.at(4))                                           # window end, excluded
+        self.remind(self.at(1, 9), recurrence="daily")                    # started before the window
+        self.remind(self.at(3), user=make_user("E2"))                     # someone else's
+        self.due("due on the 3rd", date(2026, 3, 3))
+        self.due("due after", date(2026, 3, 4))
+        self.due("closed", date(2026, 3, 2), status="completed")
+
+        self.assertEqual(self.agenda(), [
+            ("reminder", "2026-03-02T00:00:00Z", "none", "bus service"),
+            ("reminder", "2026-03-02T09:00:00Z", "daily", "bus service"),
+            ("due", "2026-03-03T00:00:00Z", None, "due on the 3rd"),
+            ("reminder", "2026-03-03T09:00:00Z", "daily", "bus service"),
+            ("reminder", "2026-03-03T23:59:59.999999Z", "none", "bus service"),
+        ])
+
+    def test_midnight_item_belongs_to_the_day_it_starts(self):
+        self.remind(self.at(3))
+        self.due("due on the 3rd", date(2026, 3, 3))
+        self.assertEqual(self.agenda("from=2026-03-02&to=2026-03-02"), [])
+        self.assertEqual([kind for kind, *_ in self.agenda("from=2026-03-03&to=2026-03-03")], ["due", "reminder"])
+
+
+@mock.patch("glamth.tasks.send_dashboard_events")
+class GatePassExpiryTests(APITestCase):
+
+    def setUp(self):
+        self.holder = make_user()
+        self.creator = make_user("E2")
+        self.thread = make_thread(self.creator)
+        now = timezone.now()
+        self.passes = {
+            name: GatePass.objects.create(
+                thread=self.thread, issued_to=self.holder, purpose=name, status=status,
+                valid_from=now - timedelta(hours=3), valid_to=now + timedelta(minutes=minutes),
+            )
+            for name, status, minutes in (
+                ("overdue out", "out", -5),
+                ("overdue out 2", "out", -60),
+                ("out in time", "out", 30),
+                ("approved, never left", "approved", -5),
+                ("back in", "in", -5),
+            )
+        }
+
+    def statuses(self):
+        return dict(GatePass.objects.values_list("purpose", "status"))
+
+    def test_only_overdue_out_passes_expire(self, send):
+        self.assertEqual(expire_gate_passes(), {"expired": 2, "users_notified": 2})
+        self.assertEqual(self.statuses(), {
+            "overdue out": "expired", "overdue out 2": "expired", "out in time": "out",
+            "approved, never left": "approved", "back in": "in",
+        })
+        expired = sorted([self.passes["overdue out"].id, self.passes["overdue out 2"].id])
+        events = send.call_args.args[0]
+        self.assertEqual(set(events), {self.holder.id, self.creator.id})
+        self.assertEqual(sorted(events[self.holder.id]["gate_passes"]), expired)
+        self.assertEqual(events[self.holder.id]["count"], 2)
+
+        self.assertEqual(expire_gate_passes(), {"expired": 0, "users_notified": 0})
+
+    @mock.patch("glamth.vehicle_board.notify_vehicles_out")
+    @mock.patch("glamth.vehicle_board.get_redis")
+    @mock.patch("glamth.views.notify_chat")
+    @mock.patch("glamth.views.notify_dashboard")
+    def test_expired_pass_can_still_be_marked_in(self, *_):
+        expire_gate_passes()
+        gate_pass = self.passes["overdue out"]
+        self.client.force_authenticate(self.holder)
+        response = self.client.patch(f"/api/gate-passes/{gate_pass.id}/mark-in/")
+        self.assertEqual(response.status_code, 200)
+        gate_pass.refresh_from_db()
+        self.assertEqual((gate_pass.status, gate_pass.pass_mode), ("in", "in"))
+        self.assertIsNotNone(gate_pass.in_time)
@@ -0,0 +1,115 @@
+import logging
+import time
+from collections.abc import Mapping
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = bucket key, ARGV = capacity, refill per second, now
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+_client = None
+_script = None
+
+
+def get_redis():
+    global _client, _script
+    if _client is None:
+        _client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL, socket_timeout=0.5)
+        _script = _client.register_script(TOKEN_BUCKET_LUA)
+    return _script
+
+
+def take_token(key, capacity, rate):
+    """
+    Take one token from the bucket. Returns (allowed, seconds_to_wait).
+    Fails open if Redis is unreachable so an outage never locks out logins.
+    """
+    try:
+        allowed, wait = get_redis()(keys=[key], args=[capacity, rate, time.time()])
+    except redis.RedisError:
+        logger.warning("Throttle store unavailable, allowing %s", key)
+        return True, 0
+    return bool(int(allowed)), float(wait)
+
+
+class RedisTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket kept in Redis so every worker shares the same budget.
+    Rates come from settings.THROTTLE_BUCKETS[scope] = (burst, per_second).
+
+    Subclasses set ``scope`` and ``get_key(self, request, view)``, which
+    returns the bucket key, or None to let the request through unthrottled.
+    """
+    scope = None
+    get_key = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.scope is None or not callable(cls.get_key):
+            raise ImproperlyConfigured(f"{cls.__name__} needs a scope and a get_key method")
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        capacity, rate = settings.THROTTLE_BUCKETS[self.scope]
+        allowed, self.retry_after = take_token(f"throttle:{self.scope}:{key}", capacity, rate)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginIPThrottle(RedisTokenBucketThrottle):
+    scope = "login_ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(RedisTokenBucketThrottle):
+    scope = "login_email"
+
+    def get_key(self, request, view):
+        # a JSON list / scalar body is left to the serializer's 400
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get("email")
+        if not email:
+            return None
+        return str(email).strip().lower()
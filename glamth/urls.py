@@ -9,21 +9,31 @@ router.register(r'work-progress', WorkProgressUpdateViewSet, basename='work-prog
 router.register(r'gate-passes', GatePassViewSet, basename='gate-pass')
 router.register(r'work-claims', WorkClaimViewSet, basename='work-claim')
 router.register(r'reminders', ReminderThreadViewSet, basename='reminders')
+router.register(r'approvals', ApprovalLedgerViewSet, basename='approval')
 
 urlpatterns = [
     path('', include(router.urls)),          # ✅ USERS API WORKS HERE
     path('login/', LoginAPIView.as_view(), name='login'),   # ✅ LOGIN API
     path('dashboard-counts/', DashboardCountAPIView.as_view(), name='dashboard-counts'),
-    path('threads/<int:thread_id>/full-detail/', FullThreadDetailAPIView.as_view()),
+    path('threads/', WorkThreadListAPIView.as_view(), name='thread-list'),
+    path('exports/<slug:name>.<slug:file_type>', ExportAPIView.as_view(), name='export'),
+    path('finance/rollups/', FinanceRollupAPIView.as_view(), name='finance-rollups'),
+    path('imports/approvals/', ApprovalImportAPIView.as_view(), name='approval-import'),
+    path('threads/<int:thread_id>/full-detail/', FullThreadDetailAPIView.as_view(), name='thread-full-detail'),
     path('threads/create/', WorkThreadCreateAPIView.as_view(), name='create-thread'),
     path(
         'threads/<int:thread_id>/approve-reject/',
         WorkThreadApprovalAPIView.as_view(),
         name='thread-approve-reject'
     ),
+    path(
+        'threads/bulk-approve-reject/',
+        WorkThreadBulkApprovalAPIView.as_view(),
+        name='thread-bulk-approve-reject'
+    ),
     path('threads/send-message/', SendThreadMessageAPIView.as_view(), name='send-thread-message'),
     path('auth/me/', MeAPIView.as_view(), name='me'),
-    path("threads/<int:pk>/mark-completed/", MarkWorkThreadCompletedAPIView.as_view()),
+    path("threads/<int:pk>/mark-completed/", MarkWorkThreadCompletedAPIView.as_view(), name='thread-mark-completed'),
     path("save-subscription/", SaveSubscriptionAPIView.as_view(), name="save_subscription"),
     path("delete-subscription/", DeleteSubscriptionAPIView.as_view(), name="delete_subscription"),
     
@@ -1,5 +1,8 @@
+from datetime import datetime, time, timedelta
+
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
+from django.utils import timezone
 
 def broadcast_thread_message(thread_id, data):
     channel_layer = get_channel_layer()
@@ -7,6 +10,39 @@ def broadcast_thread_message(thread_id, data):
         f"chat_{thread_id}",
         {
             "type": "chat_message",
+            "thread_id": thread_id,
             "message": data
         }
     )
+
+
+def day_bounds(day):
+    """
+    [start, end) datetimes of a local calendar day. Filtering on this range
+    instead of ``field__date=day`` lets the database use the index.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+async def _pull(iterator, thread_sensitive):
+    next_chunk = sync_to_async(next, thread_sensitive=thread_sensitive)
+    while True:
+        chunk = await next_chunk(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def streaming_body(request, iterator, thread_sensitive=True):
+    """
+    Body for a StreamingHttpResponse that stays chunked under ASGI too.
+
+    Django reads a sync iterator into a list before sending it over ASGI,
+    so there it is pulled one chunk at a time instead. Keep
+    ``thread_sensitive`` for database iterators; plain file reads can use
+    any thread.
+    """
+    if hasattr(request, "scope"):   # ASGIRequest
+        return _pull(iter(iterator), thread_sensitive)
+    return iterator
@@ -0,0 +1,174 @@
+"""
+Live "vehicles currently out" board.
+
+Every gate pass that is outside campus (status 'out', or 'expired' when
+it went past valid_to without coming back) has one entry in a Redis hash,
+pass id -> JSON. Entries are added when a pass goes OUT and removed when
+it comes IN, and each change is pushed to the ``vehicles_out`` WebSocket
+topic. Editing or deleting a pass refreshes its entry. ``manage.py
+rebuild_vehicle_board`` (also run by beat) rebuilds the hash from the
+database; a rebuild also stores a BUILT_FIELD marker, and a read that finds
+no marker (key evicted, flushed, or recreated by a lone update) rebuilds
+first, so an empty hash always means nothing is outside. Duration out and
+overdue flags are worked out when the board is read, so entries never need
+touching while out.
+"""
+import json
+import logging
+from datetime import datetime
+
+import redis
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .gatepass import get_redis
+from .models import GatePass
+from .realtime import notify_vehicles_out
+
+
+logger = logging.getLogger(__name__)
+
+BOARD_KEY = "gatepass:out"
+BUILT_FIELD = "built"   # set by rebuild_board(), never a pass id
+OUTSIDE_STATUSES = ('out', 'expired')
+
+
+def board_entries(queryset):
+    """{pass id: entry} for the given passes, one query."""
+    rows = queryset.values(
+        'id', 'thread_id', 'thread__thread_number', 'thread__title',
+        'issued_to_id', 'issued_to__full_name', 'vehicle_number', 'purpose',
+        'out_time', 'valid_to',
+    )
+    return {
+        row['id']: {
+            "id": row['id'],
+            "thread_id": row['thread_id'],
+            "thread_number": row['thread__thread_number'],
+            "thread_title": row['thread__title'],
+            "issued_to": row['issued_to_id'],
+            "issued_to_name": row['issued_to__full_name'],
+            "vehicle_number": row['vehicle_number'],
+            "purpose": row['purpose'],
+            "out_time": row['out_time'].isoformat() if row['out_time'] else None,
+            "valid_to": row['valid_to'].isoformat(),
+        }
+        for row in rows
+    }
+
+
+def with_flags(entry, now):
+    out_time = datetime.fromisoformat(entry["out_time"]) if entry["out_time"] else None
+    valid_to = datetime.fromisoformat(entry["valid_to"])
+    return {
+        **entry,
+        "minutes_out": int((now - out_time).total_seconds() // 60) if out_time else None,
+        "overdue": now > valid_to,
+        "overdue_minutes": max(0, int((now - valid_to).total_seconds() // 60)),
+    }
+
+
+# =====================================================
+# ✅ INCREMENTAL UPDATES
+# =====================================================
+
+def board_mark_out(pass_ids):
+    """Passes that just went OUT: add to the board and push to subscribers."""
+    if not pass_ids:
+        return
+    entries = board_entries(GatePass.objects.filter(id__in=pass_ids, status__in=OUTSIDE_STATUSES))
+    if not entries:
+        return
+    try:
+        get_redis().hset(BOARD_KEY, mapping={pass_id: json.dumps(e) for pass_id, e in entries.items()})
+    except redis.RedisError:
+        logger.warning("Vehicle board unavailable, %s OUT entries not indexed", len(entries))
+
+    now = timezone.now()
+    notify_vehicles_out({"action": "out", "vehicles": [with_flags(e, now) for e in entries.values()]})
+
+
+def board_mark_in(pass_ids):
+    """Passes that came back IN: drop from the board and push to subscribers."""
+    if not pass_ids:
+        return
+    try:
+        get_redis().hdel(BOARD_KEY, *pass_ids)
+    except redis.RedisError:
+        logger.warning("Vehicle board unavailable, %s IN entries not removed", len(pass_ids))
+
+    notify_vehicles_out({"action": "in", "gate_passes": list(pass_ids)})
+
+
+def board_refresh(pass_ids):
+    """
+    Passes edited (valid_to, vehicle, ...) or deleted: re-read them and
+    replace or drop their entries. Still outside -> "out" push (clients
+    upsert by id), otherwise -> "in" push (clients drop the id).
+    """
+    if not pass_ids:
+        return
+    entries = board_entries(GatePass.objects.filter(id__in=pass_ids, status__in=OUTSIDE_STATUSES))
+    gone = [pass_id for pass_id in pass_ids if pass_id not in entries]
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        if entries:
+            pipe.hset(BOARD_KEY, mapping={pass_id: json.dumps(e) for pass_id, e in entries.items()})
+        if gone:
+            pipe.hdel(BOARD_KEY, *gone)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Vehicle board unavailable, %s entries not refreshed", len(pass_ids))
+
+    if entries:
+        now = timezone.now()
+        notify_vehicles_out({"action": "out", "vehicles": [with_flags(e, now) for e in entries.values()]})
+    if gone:
+        notify_vehicles_out({"action": "in", "gate_passes": gone})
+
+
+# =====================================================
+# ✅ READ / REBUILD
+# =====================================================
+
+def board_snapshot():
+    """Everything outside now, overdue first then longest out."""
+    try:
+        raw = get_redis().hgetall(BOARD_KEY)
+        if BUILT_FIELD.encode() not in raw:
+            # evicted / flushed / never built: an empty read would look like "nobody out"
+            logger.info("Vehicle board missing, rebuilding from the database")
+            entries = list(build_board().values())
+        else:
+            entries = [json.loads(item) for field, item in raw.items() if field != BUILT_FIELD.encode()]
+    except redis.RedisError:
+        logger.warning("Vehicle board unavailable, reading from the database")
+        entries = list(board_entries(GatePass.objects.filter(status__in=OUTSIDE_STATUSES)).values())
+
+    now = timezone.now()
+    vehicles = [with_flags(entry, now) for entry in entries]
+    vehicles.sort(key=lambda v: (not v["overdue"], -(v["minutes_out"] or 0), v["id"]))
+    return vehicles
+
+
+def build_board():
+    """Replace the hash with the database's view, atomically. Returns the entries."""
+    # primary even inside a replica-routed GET (out-board): a lagging replica
+    # would be stored as BUILT and served until the next beat rebuild
+    entries = board_entries(GatePass.objects.using(DEFAULT_DB_ALIAS).filter(status__in=OUTSIDE_STATUSES))
+    client = get_redis()
+    staging = f"{BOARD_KEY}:rebuild"
+
+    mapping = {pass_id: json.dumps(e) for pass_id, e in entries.items()}
+    mapping[BUILT_FIELD] = timezone.now().isoformat()
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(staging)
+    pipe.hset(staging, mapping=mapping)
+    pipe.rename(staging, BOARD_KEY)
+    pipe.execute()
+    return entries
+
+
+def rebuild_board():
+    """Rebuild the hash from the database. Returns the entry count."""
+    return len(build_board())
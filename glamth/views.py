@@ -1,15 +1,21 @@
+from datetime import date, timedelta
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q, OuterRef, Subquery
+from django.db import transaction
+from django.db.models import CharField, Count, DateTimeField, F, Prefetch, Q, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from rest_framework import status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -18,17 +24,54 @@ from pywebpush import webpush, WebPushException
 
 from glamth.realtime import notify_dashboard, notify_chat
 
+from .exports import EXPORTS, FORMATS as EXPORT_FORMATS, date_filters, export_response
+from .fast_serializers import serialize_today_reminders, serialize_today_threads
+from .gatepass import InvalidGateToken, check_scan, enqueue_gate_events, gate_event
+from .imports import FORMATS as IMPORT_FORMATS, import_ledger
 from .models import PushSubscription, WorkThread
+from .permissions import IsFinanceUser, IsThreadApprover, is_finance_user
+from .recurrence import add_months, expand_reminders, series_overlapping
+from .rollups import DIMENSIONS as ROLLUP_DIMENSIONS, ROLLUP_SOURCES, rollup_report
 from .serializers import *
-from .utils import broadcast_thread_message
+from .tasks import apply_gate_events, overdue_threads, thread_audience
+from .throttling import LoginEmailThrottle, LoginIPThrottle
+from .utils import broadcast_thread_message, day_bounds
+from .vehicle_board import board_mark_in, board_mark_out, board_refresh, board_snapshot
 
 
 
 User = get_user_model()
 
+
+class DateParamsMixin:
+    """Date query params for list / export / report views, one 400 format for all."""
+
+    def param_date(self, name, default=None):
+        raw = self.request.query_params.get(name)
+        if not raw:
+            return default
+        try:
+            return date.fromisoformat(raw)
+        except ValueError:
+            raise ValidationError({name: "Expected YYYY-MM-DD."})
+
+    def param_month(self, name):
+        """First day of a YYYY-MM param."""
+        raw = self.request.query_params.get(name)
+        if not raw:
+            return None
+        try:
+            return date.fromisoformat(f"{raw}-01")
+        except ValueError:
+            raise ValidationError({name: "Expected YYYY-MM."})
+
+
 class LoginAPIView(APIView):
+    # ✅ Rejected before any password hashing happens
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
 
         if serializer.is_valid():
             user = serializer.validated_data['user']
@@ -59,14 +102,18 @@ class LoginAPIView(APIView):
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all().order_by("-id")
     serializer_class = UserSerializer
+    cursor_ordering = ("-id",)
     permission_classes = [IsAuthenticated, IsAdminUser]
 
 
 
 
 class DashboardCountAPIView(APIView):
+    read_replica = True   # glamth.db_router
+
     def get(self, request):
         today = timezone.now().date()
+        today_start, today_end = day_bounds(today)
         user = request.user
 
         # ===============================
@@ -101,20 +148,14 @@ class DashboardCountAPIView(APIView):
         # ===============================
         # ✅ OVERDUE THREADS
         # ===============================
+        # from the due date, every open status: a thread is overdue here
+        # before the nightly sweep marks it 'delayed'
 
-        overdue_qs = WorkThread.objects.annotate(
-            latest_due=Subquery(latest_due_date)
-        ).filter(
-            latest_due__lt=today
-        ).exclude(
-            status__in=['completed', 'payment_completed', 'workcompleted']
-        )
+        overdue_qs = overdue_threads(today).select_related('created_by')
 
         overdue_count = overdue_qs.count()
 
-        overdue_threads_data = TodayThreadListSerializer(
-            overdue_qs, many=True
-        ).data
+        overdue_threads_data = serialize_today_threads(overdue_qs)
 
         # ===============================
         # ✅ TODAY'S PENDENCY (DUE TODAY)
@@ -128,38 +169,46 @@ class DashboardCountAPIView(APIView):
 
         todays_pendency_count = todays_pendency_qs.count()
 
-        todays_pendency_data = TodayThreadListSerializer(
-            todays_pendency_qs, many=True
-        ).data
+        todays_pendency_data = serialize_today_threads(todays_pendency_qs)
 
         # ===============================
         # ✅ TODAY'S WORK (CREATED TODAY)
         # ===============================
 
         todays_work_qs = WorkThread.objects.filter(
-            created_at__date=today
+            created_at__gte=today_start,
+            created_at__lt=today_end
         )
 
         todays_work_count = todays_work_qs.count()
 
-        todays_work_data = TodayThreadListSerializer(
-            todays_work_qs, many=True
-        ).data
+        todays_work_data = serialize_today_threads(todays_work_qs)
 
         # ===============================
         # ✅ TODAY'S REMINDERS (FOR LOGGED IN USER)
         # ===============================
 
-        todays_reminders_qs = ReminderThread.objects.filter(
-            created_by=user,
-            reminder_at__date=today
-        ).order_by("reminder_at")
+        user_reminders = ReminderThread.objects.filter(
+            created_by=user
+        ).select_related('work_thread', 'work_thread__created_by')
+
+        todays_reminders = list(user_reminders.filter(
+            recurrence='none',
+            reminder_at__gte=today_start,
+            reminder_at__lt=today_end
+        ).order_by("reminder_at"))
+
+        # 🔁 recurring series expanded for today only
+        todays_reminders += expand_reminders(
+            series_overlapping(user_reminders, today_start, today_end),
+            today_start,
+            today_end
+        )
+        todays_reminders.sort(key=lambda r: (r.reminder_at, r.id))
 
-        todays_reminders_count = todays_reminders_qs.count()
+        todays_reminders_count = len(todays_reminders)
 
-        todays_reminders_data = TodayReminderSerializer(
-            todays_reminders_qs, many=True
-        ).data
+        todays_reminders_data = serialize_today_reminders(todays_reminders)
 
         # ===============================
         # ✅ FINAL DASHBOARD RESPONSE
@@ -203,6 +252,7 @@ class DashboardCountAPIView(APIView):
 
 class FullThreadDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request, thread_id):
         try:
@@ -213,7 +263,6 @@ class FullThreadDetailAPIView(APIView):
             ).prefetch_related(
                 'assigned_to',
                 'progress_updates',
-                'messages',
                 'gate_passes',   # ✅ NEW
                 'claims'         # ✅ NEW
             ).get(id=thread_id)
@@ -269,15 +318,16 @@ class WorkThreadCreateAPIView(APIView):
 
 
 class RequestCategoryViewSet(ModelViewSet):
-    queryset = RequestCategory.objects.all().order_by('-created_at')
+    queryset = RequestCategory.objects.all().order_by('-created_at', '-id')
     serializer_class = RequestCategorySerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
 
 
 
 
 class WorkThreadApprovalAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsThreadApprover]
 
     def patch(self, request, thread_id):
         thread = get_object_or_404(WorkThread, id=thread_id)
@@ -318,19 +368,315 @@ class WorkThreadApprovalAPIView(APIView):
         )
 
 
+class WorkThreadBulkApprovalAPIView(APIView):
+    """
+    POST threads/bulk-approve-reject/
+        {"thread_ids": [..], "approval_status": "approved" | "rejected",
+         "approval_remark": "optional"}
+
+    Decides every still-pending thread in one transaction with a single
+    UPDATE. Each affected user gets one dashboard refresh and each thread
+    one chat event, however many threads they share. Same approvers as the
+    single approve-reject endpoint.
+    """
+    permission_classes = [IsThreadApprover]
+
+    def post(self, request):
+        serializer = WorkThreadBulkApprovalSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(
+                {
+                    "success": False,
+                    "errors": serializer.errors
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        thread_ids = serializer.validated_data['thread_ids']
+        approval_status = serializer.validated_data['approval_status']
+
+        changes = {
+            'approval_status': approval_status,
+            'status': 'working' if approval_status == 'approved' else 'rejected',
+            'approved_by': request.user,
+            'approval_at': timezone.now(),
+            'updated_at': timezone.now(),
+        }
+        if 'approval_remark' in serializer.validated_data:
+            changes['approval_remark'] = serializer.validated_data['approval_remark']
+
+        with transaction.atomic():
+            pending = WorkThread.objects.select_for_update().filter(
+                id__in=thread_ids,
+                approval_status='pending'
+            )
+            updated = set(pending.values_list('id', flat=True))
+            WorkThread.objects.filter(id__in=updated).update(**changes)
+
+        found = set(WorkThread.objects.filter(id__in=thread_ids).values_list('id', flat=True))
+        updated_ids = [i for i in thread_ids if i in updated]
+
+        if updated_ids:
+            audience = thread_audience(updated_ids)
+            notify_dashboard(set().union(*audience.values()))
+            for thread_id in updated_ids:
+                notify_chat(thread_id, {
+                    "event": "thread_status_update",
+                    "status": approval_status,
+                    "by": request.user.full_name
+                })
+
+        return Response(
+            {
+                "success": True,
+                "message": f"{len(updated_ids)} threads {approval_status} successfully",
+                "updated": updated_ids,
+                "already_decided": [i for i in thread_ids if i in found and i not in updated],
+                "not_found": [i for i in thread_ids if i not in found]
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+
+class WorkThreadListAPIView(DateParamsMixin, ListAPIView):
+    """
+    GET threads/?status=pending,working&approval_status=approved&category=3
+                &vehicle_type=bus&assignee=7&creator=2
+                &created_from=2026-01-01&created_to=2026-01-31
+                &facets=status,approval_status,vehicle_type,category
+
+    Comma separated values are OR-ed. Keyset (cursor) paginated on
+    (-created_at, -id).
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+    serializer_class = WorkThreadListSerializer
+    cursor_ordering = ('-created_at', '-id')
+
+    # query param -> model field
+    FILTER_FIELDS = {
+        'status': 'status',
+        'approval_status': 'approval_status',
+        'vehicle_type': 'vehicle_type',
+        'category': 'request_category_id',
+        'creator': 'created_by_id',
+    }
+    FACET_FIELDS = {
+        'status': 'status',
+        'approval_status': 'approval_status',
+        'vehicle_type': 'vehicle_type',
+        'category': 'request_category_id',
+    }
+    INTEGER_PARAMS = ('category', 'creator', 'assignee')
+
+    def param_values(self, name):
+        raw = self.request.query_params.get(name)
+        if not raw:
+            return []
+        values = [v.strip() for v in raw.split(',') if v.strip()]
+        if name in self.INTEGER_PARAMS:
+            if not all(v.isdigit() for v in values):
+                raise ValidationError({name: "Expected comma separated ids."})
+            values = [int(v) for v in values]
+        return values
+
+    def get_queryset(self):
+        qs = WorkThread.objects.select_related('created_by', 'request_category')
+
+        for param, field in self.FILTER_FIELDS.items():
+            values = self.param_values(param)
+            if values:
+                qs = qs.filter(**{f'{field}__in': values})
+
+        assignees = self.param_values('assignee')
+        if assignees:
+            # subquery instead of a join so a thread is never listed twice
+            qs = qs.filter(id__in=WorkThread.assigned_to.through.objects.filter(
+                user_id__in=assignees
+            ).values('workthread_id'))
+
+        created_from = self.param_date('created_from')
+        if created_from:
+            qs = qs.filter(created_at__gte=day_bounds(created_from)[0])
+
+        created_to = self.param_date('created_to')
+        if created_to:
+            qs = qs.filter(created_at__lt=day_bounds(created_to)[1])
+
+        return qs
+
+    def get_facets(self, queryset):
+        names = self.param_values('facets')
+        unknown = [n for n in names if n not in self.FACET_FIELDS]
+        if unknown:
+            raise ValidationError({'facets': f"Unknown facets: {', '.join(unknown)}"})
+        if not names:
+            return None
+
+        # ✅ ONE grouped query for every requested facet
+        fields = [self.FACET_FIELDS[n] for n in names]
+        rows = queryset.order_by().values(*fields).annotate(count=Count('id'))
+
+        facets = {name: {} for name in names}
+        for row in rows:
+            for name, field in zip(names, fields):
+                key = row[field]
+                facets[name][key] = facets[name].get(key, 0) + row['count']
+
+        return {
+            name: [{"value": value, "count": count} for value, count in counts.items()]
+            for name, counts in facets.items()
+        }
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = self.get_facets(queryset)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+
+        if facets is not None:
+            response.data['facets'] = facets
+        return response
+
+
+
+# ✅ Ledger datasets, same audience as the finance APIs
+FINANCE_EXPORTS = {'payments', 'payment-details'}
+
+
+class ExportAPIView(DateParamsMixin, APIView):
+    """
+    GET exports/<threads|claims|gate-passes|payments|payment-details>.<csv|xlsx>
+        ?month=2026-01   or   ?from=2026-01-01&to=2026-01-31
+
+    Streamed, so any number of rows is exported in constant memory. The
+    finance datasets (FINANCE_EXPORTS) are for finance users only.
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+
+    def get(self, request, name, file_type):
+        if name not in EXPORTS or file_type not in EXPORT_FORMATS:
+            return Response(
+                {"error": "Unknown export"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if name in FINANCE_EXPORTS and not is_finance_user(request.user):
+            self.permission_denied(request)
+
+        month = self.param_month('month')
+        if month:
+            start, end = month, add_months(month, 1) - timedelta(days=1)
+            label = f"{month:%Y-%m}"
+        else:
+            start, end = self.param_date('from'), self.param_date('to')
+            label = f"{start or 'start'}_{end or 'today'}" if (start or end) else 'all'
+
+        return export_response(
+            request, name, file_type,
+            date_filters(name, start, end),
+            filename=f"{name}-{label}"
+        )
+
+
+class ApprovalImportAPIView(APIView):
+    """
+    POST imports/approvals/   multipart: file=<.csv|.xlsx>, dry_run=1 (optional)
+
+    Bulk upsert of approvals, flow levels, payment masters and transactions
+    (row layout in glamth.imports). Invalid rows are skipped and listed by
+    row number; dry_run validates everything and writes nothing.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': "Upload a .csv or .xlsx file."})
+        file_type = upload.name.rsplit('.', 1)[-1].lower()
+        if file_type not in IMPORT_FORMATS:
+            raise ValidationError({'file': "Upload a .csv or .xlsx file."})
+
+        dry_run = str(request.data.get('dry_run', request.query_params.get('dry_run', ''))).lower() in ('1', 'true', 'yes')
+        result = import_ledger(upload, file_type, dry_run=dry_run)
+
+        return Response({
+            "success": True,
+            "result": result,
+        }, status=status.HTTP_200_OK)
+
+
+class FinanceRollupAPIView(DateParamsMixin, APIView):
+    """
+    GET finance/rollups/?source=paid&group_by=department,month
+        &from=2026-01&to=2026-06&department=...&category=...&vendor=...&status=...
+
+    source: claims | issued | paid. Reads the pre-aggregated FinanceRollup
+    table (glamth.rollups), never the claim / payment rows.
+    """
+    permission_classes = [IsFinanceUser]
+    read_replica = True
+
+    def get(self, request):
+        source = request.query_params.get('source', 'paid')
+        if source not in ROLLUP_SOURCES:
+            raise ValidationError({'source': f"One of: {', '.join(ROLLUP_SOURCES)}."})
+
+        allowed = ('month',) + ROLLUP_DIMENSIONS
+        # "?group_by=" (empty) would group by nothing and return raw rollup rows
+        group_by = [g for g in request.query_params.get('group_by', '').split(',') if g] or ['month']
+        unknown = set(group_by) - set(allowed)
+        if unknown:
+            raise ValidationError({'group_by': f"Unknown: {', '.join(sorted(unknown))}. Use: {', '.join(allowed)}."})
+
+        filters = {
+            name: request.query_params[name]
+            for name in ROLLUP_DIMENSIONS if name in request.query_params
+        }
+        rows = rollup_report(
+            source, group_by,
+            start=self.param_month('from'),
+            end=self.param_month('to'),
+            filters=filters,
+        )
+
+        return Response({
+            "success": True,
+            "source": source,
+            "group_by": group_by,
+            "rows": rows,
+            "total_amount": sum((row['amount'] for row in rows), 0),
+            "total_count": sum(row['count'] for row in rows),
+        })
+
+
 
 class WorkProgressUpdateViewSet(ModelViewSet):
     queryset = WorkProgressUpdate.objects.select_related(
         'thread', 'updated_by'
-    ).order_by('-created_at')
+    ).order_by('-created_at', '-id')
 
     serializer_class = WorkProgressUpdateSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
+    read_replica = True   # GET actions (glamth.db_router)
 
     def perform_create(self, serializer):
         obj = serializer.save(updated_by=self.request.user)
         thread = obj.thread
 
+        # ✅ New due date in the future = back to the status it was delayed from
+        if thread.status == 'delayed' and obj.expected_end_date >= timezone.now().date():
+            WorkThread.objects.filter(id=thread.id, status='delayed').update(
+                status=Coalesce('status_before_delay', Value('working')),
+                status_before_delay=None,
+            )
+
         user_ids = [thread.created_by.id]
         user_ids += list(thread.assigned_to.values_list('id', flat=True))
         notify_dashboard(user_ids)
@@ -404,9 +750,11 @@ class MeAPIView(APIView):
 
 
 class GatePassViewSet(ModelViewSet):
-    queryset = GatePass.objects.all().order_by('-created_at')
+    queryset = GatePass.objects.all().order_by('-created_at', '-id')
     serializer_class = GatePassSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
+    read_replica = True   # GET actions (glamth.db_router)
 
     # --------------------------------------------------
     # ✅ CREATE = AUTO OUT
@@ -425,6 +773,7 @@ class GatePassViewSet(ModelViewSet):
         user_ids += list(thread.assigned_to.values_list('id', flat=True))
         notify_dashboard(user_ids)
         notify_chat(thread.id, {"event":"gatepass_out","by":request.user.full_name})
+        board_mark_out([gate_pass.id])
 
         return Response(
             {
@@ -435,6 +784,18 @@ class GatePassViewSet(ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    # --------------------------------------------------
+    # ✅ EDIT / DELETE keep the live board in step
+    # --------------------------------------------------
+    def perform_update(self, serializer):
+        gate_pass = serializer.save()
+        board_refresh([gate_pass.id])
+
+    def perform_destroy(self, instance):
+        pass_id = instance.id
+        instance.delete()
+        board_refresh([pass_id])
+
     # --------------------------------------------------
     # ✅ MARK IN (only return)
     # --------------------------------------------------
@@ -442,7 +803,8 @@ class GatePassViewSet(ModelViewSet):
     def mark_in(self, request, pk=None):
         gate_pass = get_object_or_404(GatePass, pk=pk)
 
-        if gate_pass.status != 'out':
+        # expired = came back after valid_to, still recorded
+        if gate_pass.status not in ('out', 'expired'):
             return Response(
                 {"error": "Gate pass must be in OUT state first"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -455,18 +817,100 @@ class GatePassViewSet(ModelViewSet):
         notify_dashboard(user_ids)
 
         notify_chat(gate_pass.thread.id, {"event":"gatepass_in","by":request.user.full_name})
-        
+        board_mark_in([gate_pass.id])
+
 
         return Response(
             {"success": True, "message": "Marked as IN"},
             status=status.HTTP_200_OK
         )
 
+    # --------------------------------------------------
+    # ✅ LIVE BOARD: vehicles / people outside right now
+    # --------------------------------------------------
+    @action(detail=False, methods=['get'], url_path='out-board')
+    def out_board(self, request):
+        vehicles = board_snapshot()
+        return Response(
+            {
+                "success": True,
+                "count": len(vehicles),
+                "overdue_count": sum(1 for v in vehicles if v["overdue"]),
+                "vehicles": vehicles
+            },
+            status=status.HTTP_200_OK
+        )
+
+    # --------------------------------------------------
+    # ⚡ KIOSK: signed token, no DB read, write queued
+    # --------------------------------------------------
+    def queue_scans(self, events):
+        if not enqueue_gate_events(events):
+            apply_gate_events(events)   # queue down: write now rather than lose scans
+
+    @action(detail=False, methods=['post'], url_path='scan')
+    def scan(self, request):
+        serializer = GateScanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        direction = serializer.validated_data['direction']
+
+        try:
+            data = check_scan(serializer.validated_data['token'], direction, timezone.now())
+        except InvalidGateToken as exc:
+            return Response(
+                {"success": False, "open": False, "error": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        self.queue_scans([gate_event(data['id'], direction, request.user.id)])
+
+        return Response(
+            {
+                "success": True,
+                "open": True,
+                "gate_pass": data['id'],
+                "vehicle_number": data['vehicle_number'],
+                "direction": direction
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk-mark-in')
+    def bulk_mark_in(self, request):
+        serializer = GateBulkMarkInSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        now = timezone.now()
+
+        events, accepted, rejected = [], [], []
+        for index, scan in enumerate(serializer.validated_data['scans']):
+            try:
+                data = check_scan(scan['token'], 'in', now)
+            except InvalidGateToken as exc:
+                rejected.append({"index": index, "error": str(exc)})
+                continue
+            scanned_at = min(scan.get('scanned_at') or now, now)
+            events.append(gate_event(data['id'], 'in', request.user.id, scanned_at.timestamp()))
+            accepted.append(data['id'])
+
+        self.queue_scans(events)
+
+        return Response(
+            {
+                "success": True,
+                "message": f"{len(accepted)} scans queued",
+                "accepted": accepted,
+                "rejected": rejected
+            },
+            status=status.HTTP_200_OK
+        )
+
 
 class WorkClaimViewSet(ModelViewSet):
-    queryset = WorkClaim.objects.all().order_by('-created_at')
+    queryset = WorkClaim.objects.all().order_by('-created_at', '-id')
     serializer_class = WorkClaimSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
+    read_replica = True   # GET actions (glamth.db_router)
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     def perform_create(self, serializer):
         obj = serializer.save(created_by=self.request.user)
@@ -479,6 +923,41 @@ class WorkClaimViewSet(ModelViewSet):
         notify_chat(thread.id, {"event":"claim_added","by":self.request.user.full_name})
 
 
+class ApprovalLedgerViewSet(ReadOnlyModelViewSet):
+    """
+    GET approvals/            ?work_thread=<id>  ?approval_no=<no>
+    GET approvals/<id>/
+
+    Each approval with its flow (by level), payment masters and their
+    transactions (by sr_no). Four queries per page, whatever the size:
+    approvals + thread, flows, masters, transactions.
+    """
+    serializer_class = ApprovalLedgerSerializer
+    cursor_ordering = ('-created_at', '-id')
+    permission_classes = [IsFinanceUser]
+    read_replica = True   # GET actions (glamth.db_router)
+
+    def get_queryset(self):
+        queryset = Approval.objects.select_related('work_thread').prefetch_related(
+            Prefetch('approval_flow', queryset=ApprovalFlow.objects.order_by('level', 'id')),
+            Prefetch(
+                'payment_master',
+                queryset=PaymentMaster.objects.order_by('created_at', 'id').prefetch_related(
+                    Prefetch('payment_details', queryset=PaymentDetail.objects.order_by('sr_no', 'id'))
+                ),
+            ),
+        ).order_by('-created_at', '-id')
+
+        params = self.request.query_params
+        if params.get('work_thread'):
+            if not params['work_thread'].isdigit():
+                raise ValidationError({'work_thread': "Expected a thread id."})
+            queryset = queryset.filter(work_thread_id=int(params['work_thread']))
+        if params.get('approval_no'):
+            queryset = queryset.filter(approval_no=params['approval_no'])
+        return queryset
+
+
 
 
 
@@ -546,16 +1025,128 @@ class DeleteSubscriptionAPIView(APIView):
 
 
 
-class ReminderThreadViewSet(ModelViewSet):
-    queryset = ReminderThread.objects.all().order_by('-reminder_at')
+class ReminderThreadViewSet(DateParamsMixin, ModelViewSet):
     serializer_class = ReminderThreadSerializer
+    cursor_ordering = ('-reminder_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+    read_replica = True   # GET actions (glamth.db_router)
+
+    AGENDA_DEFAULT_DAYS = 7
+    AGENDA_MAX_DAYS = 92
+
+    def get_queryset(self):
+        # ✅ Only the requesting user's reminders
+        return ReminderThread.objects.filter(
+            created_by=self.request.user
+        ).select_related('work_thread').order_by('-reminder_at', '-id')
 
     def perform_create(self, serializer):
         obj = serializer.save(created_by=self.request.user)
         notify_dashboard([self.request.user.id])
 
-        if obj.thread:
-            notify_chat(obj.thread.id, {"event":"reminder_added","by":self.request.user.full_name})
+        notify_chat(obj.work_thread_id, {"event":"reminder_added","by":self.request.user.full_name})
 
+    # --------------------------------------------------
+    # ✅ AGENDA = REMINDERS + THREAD DUE DATES
+    # --------------------------------------------------
+    @action(detail=False, methods=['get'], url_path='agenda')
+    def agenda(self, request):
+        start_day = self.param_date('from', timezone.now().date())
+        end_day = self.param_date('to', start_day + timedelta(days=self.AGENDA_DEFAULT_DAYS - 1))
+
+        if end_day < start_day:
+            raise ValidationError({"to": "Must be on or after from."})
+        if (end_day - start_day).days >= self.AGENDA_MAX_DAYS:
+            raise ValidationError({"to": f"Window is limited to {self.AGENDA_MAX_DAYS} days."})
+
+        window_start = day_bounds(start_day)[0]
+        window_end = day_bounds(end_day)[1]
+        user = request.user
 
+        # (created_by, reminder_at) index range
+        reminders = ReminderThread.objects.filter(
+            created_by=user,
+            recurrence='none',
+            reminder_at__gte=window_start,
+            reminder_at__lt=window_end,
+        ).annotate(
+            kind=Value('reminder', output_field=CharField()),
+            item_id=F('id'),
+            thread=F('work_thread_id'),
+            thread_no=F('work_thread__thread_number'),
+            thread_title=F('work_thread__title'),
+            at=F('reminder_at'),
+            note=F('message'),
+        ).values('kind', 'item_id', 'thread', 'thread_no', 'thread_title', 'at', 'note')
+
+        latest_due_date = WorkProgressUpdate.objects.filter(
+            thread=OuterRef('pk')
+        ).order_by('-created_at').values('expected_end_date')[:1]
+
+        assigned_ids = WorkThread.assigned_to.through.objects.filter(
+            user_id=user.id
+        ).values('workthread_id')
+
+        dues = WorkThread.objects.filter(
+            Q(created_by=user) | Q(id__in=assigned_ids)
+        ).exclude(
+            status__in=CLOSED_THREAD_STATUSES
+        ).annotate(
+            latest_due=Subquery(latest_due_date)
+        ).filter(
+            latest_due__gte=start_day,
+            latest_due__lte=end_day,
+        ).annotate(
+            kind=Value('due', output_field=CharField()),
+            item_id=F('id'),
+            thread=F('id'),
+            thread_no=F('thread_number'),
+            thread_title=F('title'),
+            at=Cast('latest_due', DateTimeField()),
+            note=Value(None, output_field=TextField()),
+        ).values('kind', 'item_id', 'thread', 'thread_no', 'thread_title', 'at', 'note')
+
+        # ✅ ONE UNION query, ordered by time
+        rows = reminders.union(dues, all=True).order_by('at', 'kind', 'item_id')
+
+        items = [
+            {
+                "kind": row['kind'],
+                "id": row['item_id'],
+                "work_thread": row['thread'],
+                "work_thread_number": row['thread_no'],
+                "title": row['thread_title'],
+                "at": row['at'],
+                "message": row['note'],
+                "recurrence": 'none' if row['kind'] == 'reminder' else None,
+            }
+            for row in rows
+        ]
+
+        # 🔁 recurring series, expanded only for this window
+        series = series_overlapping(
+            ReminderThread.objects.filter(created_by=user), window_start, window_end
+        ).select_related('work_thread')
+
+        items += [
+            {
+                "kind": 'reminder',
+                "id": occurrence.id,
+                "work_thread": occurrence.work_thread_id,
+                "work_thread_number": occurrence.work_thread.thread_number,
+                "title": occurrence.work_thread.title,
+                "at": occurrence.reminder_at,
+                "message": occurrence.message,
+                "recurrence": occurrence.recurrence,
+            }
+            for occurrence in expand_reminders(series, window_start, window_end)
+        ]
+        items.sort(key=lambda item: (item['at'], item['kind'], item['id']))
+
+        return Response({
+            "success": True,
+            "from": start_day,
+            "to": end_day,
+            "count": len(items),
+            "items": items,
+        }, status=status.HTTP_200_OK)
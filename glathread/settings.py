@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,16 +45,35 @@ INSTALLED_APPS = [
 ]
 
 
-ASGI_APPLICATION = 'core.asgi.application'
+ASGI_APPLICATION = 'glathread.asgi.application'
+
+# "redis" (default) or "memory" for single-process dev / benchmarks
+CHANNEL_LAYER_BACKEND = os.environ.get("CHANNEL_LAYER_BACKEND", "redis")
+CHANNEL_REDIS_HOST = os.environ.get("CHANNEL_REDIS_HOST", "127.0.0.1")
+CHANNEL_REDIS_PORT = int(os.environ.get("CHANNEL_REDIS_PORT", 6379))
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+if CHANNEL_LAYER_BACKEND == "memory":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [(CHANNEL_REDIS_HOST, CHANNEL_REDIS_PORT)],
+            },
+        },
+    }
+
+
+# Per-connection outbound queue (glamth.outbound)
+WS_COALESCE_WINDOW = float(os.environ.get("WS_COALESCE_WINDOW", 0.5))   # seconds
+WS_MAX_QUEUED_FRAMES = int(os.environ.get("WS_MAX_QUEUED_FRAMES", 100))
+WS_OVERFLOW_POLICY = os.environ.get("WS_OVERFLOW_POLICY", "close")      # "close" or "drop"
+WS_MAX_SUBSCRIPTIONS = int(os.environ.get("WS_MAX_SUBSCRIPTIONS", 50))  # topics per ws/stream/ socket
 
 
 
@@ -98,12 +118,95 @@ CORS_ALLOWED_ORIGINS = [
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default, small installs) or postgres
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+# seconds a connection is reused, 0 = one per request. Served under ASGI
+# (ASGI_APPLICATION), persistent connections belong to whichever worker thread
+# ran the sync code and are not reliably closed, so keep 0 there and pool on
+# PostgreSQL; raise it only for WSGI or Celery workers
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", 0))
+
+if DB_ENGINE == "postgres":
+    # DB_POOL=1 (default): psycopg connection pool per process (needs psycopg[pool]);
+    # pooled connections are returned after each request, so CONN_MAX_AGE is 0
+    DB_POOL = os.environ.get("DB_POOL", "1") == "1"
+    DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 2))
+    DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))  # seconds to wait for a free connection
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DB_NAME", "glathread"),
+            'USER': os.environ.get("DB_USER", "glathread"),
+            'PASSWORD': os.environ.get("DB_PASSWORD", ""),
+            'HOST': os.environ.get("DB_HOST", "127.0.0.1"),
+            'PORT': os.environ.get("DB_PORT", "5432"),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # behind PgBouncer in transaction mode, cursors can't outlive a transaction
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get("DB_PGBOUNCER", "0") == "1",
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+            },
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+else:
+    # WAL lets readers run alongside the single writer; writers wait up to
+    # busy_timeout for the lock, and IMMEDIATE transactions take it up front
+    # instead of failing with "database is locked" when upgrading mid-transaction
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 20000))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 128 * 1024 * 1024))
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                'init_command': ';'.join([
+                    'PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=NORMAL',   # durable at checkpoints; safe with WAL
+                    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+                    f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+                    'PRAGMA temp_store=MEMORY',
+                    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+                ]),
+            },
+        }
     }
-}
+
+
+# ✅ READ REPLICA (glamth.db_router): set DB_REPLICA_HOST (postgres) or
+# DB_REPLICA_NAME (a second SQLite file) to send safe dashboard / detail /
+# list reads there
+DB_REPLICA_HOST = os.environ.get("DB_REPLICA_HOST", "")
+DB_REPLICA_NAME = os.environ.get("DB_REPLICA_NAME", "")
+READ_REPLICA_STICKY_SECONDS = float(os.environ.get("READ_REPLICA_STICKY_SECONDS", 5))   # primary-only after a write
+READ_REPLICA_REDIS_URL = os.environ.get("READ_REPLICA_REDIS_URL", "redis://localhost:6379/4")
+
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == "postgres":
+        DATABASES['replica']['HOST'] = DB_REPLICA_HOST
+        DATABASES['replica']['PORT'] = os.environ.get("DB_REPLICA_PORT", DATABASES['default']['PORT'])
+    else:
+        DATABASES['replica']['NAME'] = DB_REPLICA_NAME
+    DATABASE_ROUTERS = ['glamth.db_router.ReplicaRouter']
+    MIDDLEWARE.append('glamth.db_router.ReplicaRoutingMiddleware')
 
 
 # Password validation
@@ -145,17 +248,52 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# uploads are stored under a hash of their content so their URLs can be cached forever
+STORAGES = {
+    "default": {"BACKEND": "glamth.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# ✅ METRICS (glamth.metrics): Prometheus text format on /metrics, needs
+# prometheus_client; several worker processes share PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# /metrics answers 403 unless the scraper sends the token or comes from an allowed IP
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")   # "Authorization: Bearer <token>"
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()]
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'glamth.metrics.MetricsMiddleware')
+
+# media delivery: "django" (in-process), "x-accel" (nginx) or "x-sendfile" (Apache / lighttpd)
+MEDIA_SERVE_MODE = os.environ.get("MEDIA_SERVE_MODE", "django")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = int(os.environ.get("MEDIA_CACHE_MAX_AGE", 365 * 24 * 60 * 60))
+MEDIA_REQUIRE_AUTH = os.environ.get("MEDIA_REQUIRE_AUTH", "1") == "1"   # signed media URLs (glamth.storage)
+MEDIA_URL_MAX_AGE = int(os.environ.get("MEDIA_URL_MAX_AGE", 60 * 60))   # seconds; a signed URL lasts 1-2 of these
+
 
 AUTH_USER_MODEL = 'glamth.User'
 
 
 
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 200))   # ?page_size= upper bound
+BULK_APPROVAL_MAX = int(os.environ.get("BULK_APPROVAL_MAX", 500))   # threads per bulk approve / reject call
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'glamth.pagination.DefaultCursorPagination',
 }
 
+# orjson-backed renderer (opt-in, falls back to stdlib json if orjson is missing)
+FAST_JSON_RENDERER = os.environ.get("FAST_JSON_RENDERER", "0") == "1"
+if FAST_JSON_RENDERER:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'glamth.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -171,6 +309,19 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend' # ✅ REQUIRED for Django Admin
 ]
 
+# ✅ LOGIN THROUGHPUT
+LOGIN_HASH_WORKERS = int(os.environ.get("LOGIN_HASH_WORKERS", 4))   # concurrent PBKDF2 hashes per process
+LOGIN_HASH_QUEUE = int(os.environ.get("LOGIN_HASH_QUEUE", 32))      # logins allowed to wait for a hash slot
+LOGIN_HASH_WAIT = float(os.environ.get("LOGIN_HASH_WAIT", 5))       # seconds before answering 503
+
+THROTTLE_REDIS_URL = os.environ.get("THROTTLE_REDIS_URL", "redis://localhost:6379/2")
+
+# scope: (burst, tokens refilled per second)
+THROTTLE_BUCKETS = {
+    "login_email": (5, 5 / 60),
+    "login_ip": (30, 30 / 60),
+}
+
 
 
 import os
@@ -196,5 +347,66 @@ VAPID_CLAIMS = {
 
 
 
+from celery.schedules import crontab
+
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/1"
+
+FRONTEND_BASE_URL = os.environ.get("FRONTEND_BASE_URL", "http://localhost:9002")
+
+# ✅ REMINDER DELIVERY (glamth.tasks.deliver_due_reminders)
+REMINDER_TICK_SECONDS = int(os.environ.get("REMINDER_TICK_SECONDS", 30))
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", 500))
+REMINDER_MAX_LATENESS = int(os.environ.get("REMINDER_MAX_LATENESS", 6 * 60 * 60))  # older ones are marked, not pushed
+
+GATEPASS_EXPIRY_TICK_SECONDS = int(os.environ.get("GATEPASS_EXPIRY_TICK_SECONDS", 300))
+DELAYED_SWEEP_BATCH_SIZE = int(os.environ.get("DELAYED_SWEEP_BATCH_SIZE", 500))
+
+# ✅ GATE KIOSK + VEHICLES OUT BOARD (glamth.gatepass, glamth.vehicle_board)
+GATE_QUEUE_REDIS_URL = os.environ.get("GATE_QUEUE_REDIS_URL", "redis://localhost:6379/3")
+GATE_EVENT_FLUSH_SECONDS = float(os.environ.get("GATE_EVENT_FLUSH_SECONDS", 2))
+GATE_EVENT_BATCH_SIZE = int(os.environ.get("GATE_EVENT_BATCH_SIZE", 500))
+GATE_BULK_SCAN_MAX = int(os.environ.get("GATE_BULK_SCAN_MAX", 500))   # scans per bulk mark-in call
+VEHICLE_BOARD_REBUILD_SECONDS = int(os.environ.get("VEHICLE_BOARD_REBUILD_SECONDS", 60 * 60))
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))  # rows fetched / written per chunk
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))  # rows validated / written per transaction
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 500))    # row errors listed in the report
+
+# ✅ FINANCE ROLLUPS (glamth.rollups)
+FINANCE_ROLLUP_REFRESH_SECONDS = int(os.environ.get("FINANCE_ROLLUP_REFRESH_SECONDS", 5 * 60))
+
+CELERY_BEAT_SCHEDULE = {
+    "deliver-due-reminders": {
+        "task": "glamth.tasks.deliver_due_reminders",
+        "schedule": REMINDER_TICK_SECONDS,
+    },
+    "expire-gate-passes": {
+        "task": "glamth.tasks.expire_gate_passes",
+        "schedule": GATEPASS_EXPIRY_TICK_SECONDS,
+    },
+    "flush-gate-events": {
+        "task": "glamth.tasks.flush_gate_events",
+        "schedule": GATE_EVENT_FLUSH_SECONDS,
+    },
+    "rebuild-vehicle-board": {
+        "task": "glamth.tasks.rebuild_vehicle_board",
+        "schedule": VEHICLE_BOARD_REBUILD_SECONDS,
+    },
+    "mark-overdue-threads-delayed": {
+        "task": "glamth.tasks.mark_overdue_threads_delayed",
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "reconcile-payment-totals": {
+        "task": "glamth.tasks.reconcile_payment_totals",
+        "schedule": crontab(hour=1, minute=15),
+    },
+    "refresh-finance-rollups": {
+        "task": "glamth.tasks.refresh_finance_rollups",
+        "schedule": FINANCE_ROLLUP_REFRESH_SECONDS,
+    },
+    "rebuild-finance-rollups": {
+        "task": "glamth.tasks.rebuild_finance_rollups",
+        "schedule": crontab(hour=1, minute=45),
+    },
+}
@@ -1,14 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from glamth.media import serve_media
+from glamth.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('glamth.urls')),
+    path('metrics', metrics_view, name='metrics'),   # ✅ PROMETHEUS SCRAPE
+    # ✅ MEDIA FILES (permission checked, bytes sent by nginx / Apache when configured)
+    re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", serve_media, name='media'),
 ]
-
-# ✅ MEDIA FILES SERVE IN DEVELOPMENT
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)